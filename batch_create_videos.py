@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+NotebookLM to YouTube Batch Video Creator
+
+Turns a whole backlog of audio files into videos. Episodes are pipelined:
+whisper and ffmpeg work shares a pool sized to the machine's cores, cover art
+requests run in their own I/O pool, so episode N+1 transcribes while episode N
+waits on OpenRouter or encodes. Encodes jump the CPU queue, so finished videos
+come out while later episodes are still transcribing.
+"""
+
+import argparse
+import asyncio
+import glob
+import heapq
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from transcribe import transcribe_audio
+from cover_art import generate_cover_art
+from video import create_video as create_video_ffmpeg
+from probe import probe_audio
+from process_runner import print_progress
+
+AUDIO_EXTENSIONS = {".m4a", ".mp3", ".wav", ".mp4", ".aac", ".ogg", ".opus", ".flac"}
+
+# whisper.cpp uses 4 threads per process by default
+WHISPER_DEFAULT_THREADS = 4
+
+# CPU pool priorities (lower runs first): an encode finishes an episode, a
+# probe unblocks one, a transcription only starts one
+ENCODE_PRIORITY = 0
+PROBE_PRIORITY = 1
+TRANSCRIBE_PRIORITY = 2
+
+def collect_episodes(source: str, output_dir: str) -> list:
+    """
+    Expands a directory, glob pattern or manifest file into episode dicts.
+
+    A manifest is either a text file with one audio path per line ("#" starts
+    a comment) or a JSON list of paths or of objects with "audio" and optional
+    "output", "prompt" and "cover_art" keys. Relative paths in a manifest are
+    resolved against the manifest's directory.
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        entries = [{"audio": str(p)} for p in sorted(source_path.iterdir())
+                   if p.suffix.lower() in AUDIO_EXTENSIONS]
+    elif source_path.is_file() and source_path.suffix.lower() == ".json":
+        with open(source_path, 'r') as f:
+            items = json.load(f)
+        entries = [item if isinstance(item, dict) else {"audio": item} for item in items]
+    elif source_path.is_file() and source_path.suffix.lower() not in AUDIO_EXTENSIONS:
+        with open(source_path, 'r') as f:
+            lines = [line.split("#", 1)[0].strip() for line in f]
+        entries = [{"audio": line} for line in lines if line]
+    else:
+        entries = [{"audio": p} for p in sorted(glob.glob(source))
+                   if Path(p).suffix.lower() in AUDIO_EXTENSIONS]
+
+    base = source_path.parent if source_path.is_file() else Path(".")
+
+    def resolve(path: str) -> Path:
+        path = Path(path).expanduser()
+        if not path.is_absolute() and source_path.is_file():
+            path = base / path
+        return path
+
+    episodes = []
+    for entry in entries:
+        audio = resolve(entry["audio"])
+        output = Path(output_dir) / f"{audio.stem}_video.mp4"
+        if entry.get("output"):
+            output = resolve(entry["output"])
+        episodes.append({
+            "audio": audio,
+            "output": output,
+            "prompt": entry.get("prompt"),
+            "cover_art": str(resolve(entry["cover_art"])) if entry.get("cover_art") else None,
+        })
+    return episodes
+
+class PriorityExecutor:
+    """
+    Fixed-size thread pool that runs queued jobs lowest priority number
+    first, and in submission order within a priority.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "worker"):
+        self._queue = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._work, name=f"{thread_name_prefix}_{i}", daemon=True)
+                         for i in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, priority: int, fn) -> Future:
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            heapq.heappush(self._queue, (priority, next(self._order), fn, future))
+            self._condition.notify()
+        return future
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, fn, future = heapq.heappop(self._queue)
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn())
+                except BaseException as e:
+                    future.set_exception(e)
+
+    def shutdown(self, wait: bool = True):
+        """Stops the workers once the queue is drained."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+class BatchRunner:
+    """Schedules episodes through the transcribe → cover art → encode pipeline."""
+
+    def __init__(self, cpu_workers: int, io_workers: int, custom_prompt: str = None,
+                 cover_art_path: str = None, loop_segment_seconds: float = None,
+                 whisper_model: str = None):
+        self.cpu_pool = PriorityExecutor(cpu_workers, thread_name_prefix="cpu")
+        self.io_pool = PriorityExecutor(io_workers, thread_name_prefix="io")
+        self.custom_prompt = custom_prompt
+        self.cover_art_path = cover_art_path
+        self.loop_segment_seconds = loop_segment_seconds
+        self.whisper_model = whisper_model
+        # Whisper jobs split the cores between the CPU workers
+        self.cpu_workers = cpu_workers
+
+    async def _stage(self, pool, stats: dict, name: str, priority: int, fn, *args, **kwargs):
+        def timed():
+            # Timed on the worker, so time spent queued behind other episodes doesn't count
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats["stages"][name] = time.perf_counter() - start
+
+        return await asyncio.wrap_future(pool.submit(priority, timed))
+
+    def _cover_art(self, prompt_text: str, output_dir: str, custom_prompt: bool = False) -> str:
+        try:
+            return generate_cover_art(prompt_text, output_dir, custom_prompt=custom_prompt)
+        except Exception as e:
+            print(f"❌ Cover art generation failed: {e}")
+            placeholder_path = Path("data/placeholder.png")
+            if placeholder_path.exists():
+                print("🔄 Falling back to placeholder...")
+                return str(placeholder_path)
+            raise
+
+    async def run_episode(self, episode: dict) -> dict:
+        audio = episode["audio"]
+        stats = {"name": audio.name, "stages": {}, "duration": None, "ok": False, "error": None}
+        start = time.perf_counter()
+        prep_dir = tempfile.mkdtemp(prefix="notebooklm_batch_")
+        try:
+            if not audio.exists():
+                raise FileNotFoundError(f"Audio file not found: {audio}")
+            print(f"🎵 [{audio.name}] Queued")
+
+            audio_info = await self._stage(self.cpu_pool, stats, "probe", PROBE_PRIORITY,
+                                          probe_audio, str(audio))
+            stats["duration"] = audio_info.duration
+
+            cover_art_path = episode["cover_art"] or self.cover_art_path
+            prompt = episode["prompt"] or self.custom_prompt
+            video_audio, video_audio_info = str(audio), audio_info
+
+            if cover_art_path:
+                final_cover_art = cover_art_path
+            else:
+                transcript_text = None
+                if not prompt:
+                    mux_audio_path = None
+                    if not audio_info.mp4_compatible:
+                        mux_audio_path = str(Path(prep_dir) / f"{audio.stem}.m4a")
+                    transcript_path = await self._stage(
+                        self.cpu_pool, stats, "transcribe", TRANSCRIBE_PRIORITY, transcribe_audio, str(audio),
+                        audio_info=audio_info, mux_audio_path=mux_audio_path,
+                        model=self.whisper_model, concurrent_jobs=self.cpu_workers,
+                        on_progress=print_progress(name=audio.name)
+                    )
+                    print(f"📝 [{audio.name}] Transcribed")
+                    with open(transcript_path, 'r') as f:
+                        transcript_text = f.read()
+                    if mux_audio_path:
+                        video_audio, video_audio_info = mux_audio_path, None
+                final_cover_art = await self._stage(self.io_pool, stats, "cover_art", 0,
+                                                    self._cover_art, prompt or transcript_text,
+                                                    str(episode["output"].parent),
+                                                    custom_prompt=bool(prompt))
+                print(f"🎨 [{audio.name}] Cover art ready")
+
+            episode["output"].parent.mkdir(parents=True, exist_ok=True)
+            await self._stage(self.cpu_pool, stats, "encode", ENCODE_PRIORITY, create_video_ffmpeg,
+                              final_cover_art, video_audio, str(episode["output"]),
+                              loop_segment_seconds=self.loop_segment_seconds,
+                              audio_info=video_audio_info,
+                              on_progress=print_progress(name=audio.name))
+            print(f"🎬 [{audio.name}] Video saved: {episode['output']}")
+            stats["ok"] = True
+        except Exception as e:
+            stats["error"] = str(e)
+            print(f"❌ [{audio.name}] Failed: {e}")
+        finally:
+            shutil.rmtree(prep_dir, ignore_errors=True)
+            stats["wall"] = time.perf_counter() - start
+        return stats
+
+    async def run(self, episodes: list) -> list:
+        try:
+            return await asyncio.gather(*(self.run_episode(episode) for episode in episodes))
+        finally:
+            self.cpu_pool.shutdown(wait=True)
+            self.io_pool.shutdown(wait=True)
+
+def print_summary(results: list, wall: float):
+    """Prints per-episode stage times and aggregate throughput."""
+    print("\n📊 Batch summary")
+    print(f"{'Episode':<40} {'Audio':>8} {'Transcr.':>9} {'Cover':>8} {'Encode':>8} {'Wall':>8} {'x RT':>6}")
+    for stats in results:
+        stages = stats["stages"]
+        duration = stats["duration"] or 0
+        def cell(name):
+            return f"{stages[name]:7.1f}s" if name in stages else "       -"
+        realtime = f"{duration / stats['wall']:5.1f}x" if duration and stats["ok"] else "     -"
+        status = "" if stats["ok"] else "  FAILED"
+        print(f"{stats['name'][:40]:<40} {duration / 60:6.1f}m {cell('transcribe'):>9} "
+              f"{cell('cover_art'):>8} {cell('encode'):>8} {stats['wall']:7.1f}s {realtime:>6}{status}")
+
+    done = [s for s in results if s["ok"]]
+    total_audio = sum(s["duration"] or 0 for s in done)
+    print(f"\n✅ {len(done)}/{len(results)} episodes in {wall:.1f}s")
+    if wall > 0 and done:
+        print(f"⚡ Throughput: {len(done) / wall * 3600:.1f} episodes/hour, "
+              f"{total_audio / wall:.1f}x real time ({total_audio / 60:.1f} min of audio)")
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(
+        description="🎙️ Create YouTube-ready videos for a whole backlog of audio files",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+🎯 Examples:
+
+Every audio file in a directory:
+  python3 batch_create_videos.py ~/Downloads/notebooklm/
+
+A glob pattern (quote it so the shell doesn't expand it):
+  python3 batch_create_videos.py "data/*.m4a" --output-dir videos
+
+A manifest (one path per line, or a JSON list):
+  python3 batch_create_videos.py episodes.txt --cpu-workers 4 --io-workers 8
+        """
+    )
+    parser.add_argument("source", help="Directory, glob pattern or manifest file")
+    parser.add_argument("--output-dir", default="data",
+                       help="Directory for output videos (default: data)")
+    parser.add_argument("--prompt", help="Custom prompt for AI cover art generation (skips transcription)")
+    parser.add_argument("--cover-art", help="Use this cover art image for every episode")
+    parser.add_argument("--loop-segment", type=float, metavar="SECONDS",
+                       help="Encode a still-image segment of SECONDS once and repeat it with stream copy")
+    parser.add_argument("--cpu-workers", type=int, default=max(1, cores // WHISPER_DEFAULT_THREADS),
+                       help="Concurrent whisper/ffmpeg jobs (default: cores / 4)")
+    parser.add_argument("--whisper-model", metavar="NAME",
+                       help="Whisper model name (e.g. base.en) or path (default: picked per episode)")
+    parser.add_argument("--io-workers", type=int, default=4,
+                       help="Concurrent cover art requests (default: 4)")
+    args = parser.parse_args()
+
+    episodes = collect_episodes(args.source, args.output_dir)
+    if not episodes:
+        print(f"❌ No audio files found for: {args.source}")
+        sys.exit(1)
+
+    print(f"📦 {len(episodes)} episodes, {args.cpu_workers} CPU workers, {args.io_workers} I/O workers\n")
+    runner = BatchRunner(args.cpu_workers, args.io_workers, custom_prompt=args.prompt,
+                         cover_art_path=args.cover_art, loop_segment_seconds=args.loop_segment,
+                         whisper_model=args.whisper_model)
+    start = time.perf_counter()
+    results = asyncio.run(runner.run(episodes))
+    print_summary(results, time.perf_counter() - start)
+
+    if not all(stats["ok"] for stats in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Stand-in for whisper.cpp's whisper-cli, for benchmarks without a model.
+
+Reads the 16 kHz mono 16-bit WAV given with --file (or stdin for "-") as it
+arrives, prints a segment line for every SEGMENT_SECONDS of audio like
+whisper-cli does, and writes the same segments as --output-txt, -srt, -vtt
+and -json.
+Set FAKE_WHISPER_RTF to spend that many seconds per second of audio, to
+simulate a model of a given speed.
+"""
+
+import json
+import os
+import sys
+import time
+
+SEGMENT_SECONDS = 5
+BYTES_PER_SECOND = 16000 * 2
+WAV_HEADER_BYTES = 44
+
+# A few words per segment, so prompt building and cover art have text to work
+# with. The topic changes every TOPIC_SECONDS, so chapter detection has shifts to find.
+TOPICS = (
+    "markets valuation hype bubble investors startups funding revenue",
+    "compute chips energy datacenters power cooling hardware supply",
+    "training inference models benchmarks research scaling parameters data",
+    "adoption productivity workers companies automation jobs customers tools",
+    "regulation policy governments safety copyright lawsuits rules oversight",
+)
+TOPIC_SECONDS = 300
+
+def _option(args: list, *names: str) -> str:
+    for name in names:
+        if name in args:
+            return args[args.index(name) + 1]
+    return None
+
+def _timestamp(seconds: float, separator: str = ".") -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace(".", separator)
+
+def main(args: list) -> int:
+    input_file = _option(args, "--file", "-f")
+    output_base = _option(args, "--output-file", "-of")
+    model = _option(args, "--model", "-m")
+    if not input_file or not output_base:
+        print("error: --file and --output-file are required", file=sys.stderr)
+        return 2
+    if model and not os.path.exists(model):
+        print(f"error: failed to open model '{model}'", file=sys.stderr)
+        return 1
+    rtf = float(os.getenv("FAKE_WHISPER_RTF", "0"))
+
+    stream = sys.stdin.buffer if input_file == "-" else open(input_file, "rb")
+    segments = []
+    skip = WAV_HEADER_BYTES
+    pending = 0
+    with stream:
+        while True:
+            block = stream.read(1 << 16)
+            if not block:
+                break
+            if skip:
+                taken = min(skip, len(block))
+                skip -= taken
+                block = block[taken:]
+            pending += len(block)
+            while pending >= SEGMENT_SECONDS * BYTES_PER_SECOND:
+                pending -= SEGMENT_SECONDS * BYTES_PER_SECOND
+                _emit(segments, SEGMENT_SECONDS, rtf)
+    if pending:
+        _emit(segments, pending / BYTES_PER_SECOND, rtf)
+
+    if "--output-txt" in args or "-otxt" in args:
+        with open(output_base + ".txt", "w") as f:
+            f.write("\n".join(text for _, _, text in segments) + "\n")
+    if "--output-srt" in args or "-osrt" in args:
+        with open(output_base + ".srt", "w") as f:
+            for number, (start, end, text) in enumerate(segments, 1):
+                f.write(f"{number}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n\n")
+    if "--output-vtt" in args or "-ovtt" in args:
+        with open(output_base + ".vtt", "w") as f:
+            f.write("WEBVTT\n\n")
+            for start, end, text in segments:
+                f.write(f"{_timestamp(start)} --> {_timestamp(end)}\n{text}\n\n")
+    if "--output-json" in args or "-oj" in args:
+        with open(output_base + ".json", "w") as f:
+            json.dump({"transcription": [
+                {"offsets": {"from": int(start * 1000), "to": int(end * 1000)}, "text": " " + text}
+                for start, end, text in segments
+            ]}, f)
+    return 0
+
+def _emit(segments: list, seconds: float, rtf: float):
+    start = segments[-1][1] if segments else 0.0
+    end = start + seconds
+    index = len(segments)
+    words = TOPICS[int(start // TOPIC_SECONDS) % len(TOPICS)].split()
+    text = " ".join(words[(index + i) % len(words)] for i in range(6)).capitalize() + "."
+    if rtf:
+        time.sleep(seconds * rtf)
+    segments.append((start, end, text))
+    print(f"[{_timestamp(start)} --> {_timestamp(end)}]  {text}", flush=True)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmarks
+
+Runs the full create_video.py pipeline on synthetic episodes of 1, 10 and 50
+minutes, with the cover art coming from a local stub of the OpenRouter image
+endpoint and (by default) transcription done by a fake whisper-cli, so the
+numbers only depend on this machine and this code. Stage timings come from
+the metrics records each run writes (see src/metrics.py).
+
+Save a run with --save and compare a later run against it with --compare to
+spot encoder, transcription or orchestration regressions.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_DIR / "src"))
+
+from stub_openrouter import StubOpenRouter
+
+DURATIONS_MINUTES = (1, 10, 50)
+
+# lavfi sources for the synthetic episodes. "speech" is pink noise band-limited
+# to the voice range, pulsed at a syllable-like 4 Hz, with a 1.5 second pause
+# every 9 seconds so silence detection has somewhere to cut.
+AUDIO_SOURCES = {
+    "speech": ("anoisesrc=color=pink:sample_rate=44100:amplitude=0.6,"
+               "bandpass=f=1200:width_type=h:width=2400,tremolo=f=4:d=0.8,"
+               "volume=eval=frame:volume='if(lt(mod(t,9),7.5),1,0.01)'"),
+    "sine": "sine=frequency=440:sample_rate=44100",
+    "silence": "anullsrc=channel_layout=mono:sample_rate=44100",
+}
+
+# Columns of the results table: (heading, metric key)
+COLUMNS = (
+    ("Probe", "probe"),
+    ("Transcript", "transcript"),
+    ("Whisper", "whisper"),
+    ("Cover art", "cover_art"),
+    ("Encode", "encode"),
+    ("Total", "total"),
+    ("CPU", "cpu"),
+)
+
+# Pipeline stages that produce a transcript, summed into "transcript"
+TRANSCRIPT_STAGES = ("transcript", "prefix_transcript", "full_transcript")
+
+def generate_audio(kind: str, minutes: float, media_dir: Path) -> Path:
+    """Writes (once) a synthetic AAC episode of the given length and returns its path."""
+    path = media_dir / f"{kind}_{minutes:g}min.m4a"
+    if path.exists():
+        return path
+    media_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Generating {path.name}...")
+    partial = path.with_suffix(".partial.m4a")
+    subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+         "-f", "lavfi", "-i", AUDIO_SOURCES[kind], "-t", str(minutes * 60),
+         "-ac", "2", "-c:a", "aac", "-b:a", "128k", str(partial)],
+        check=True
+    )
+    partial.rename(path)
+    return path
+
+def make_fake_whisper_dir(work_dir: Path) -> Path:
+    """A whisper.cpp directory layout whose whisper-cli is fake_whisper.py."""
+    whisper_dir = work_dir / "whisper.cpp"
+    bin_dir = whisper_dir / "build" / "bin"
+    bin_dir.mkdir(parents=True)
+    executable = bin_dir / "whisper-cli"
+    shutil.copy(Path(__file__).parent / "fake_whisper.py", executable)
+    executable.chmod(0o755)
+    (whisper_dir / "models").mkdir()
+    (whisper_dir / "models" / "ggml-base.en.bin").write_bytes(b"fake model")
+    return whisper_dir
+
+def summarise_metrics(metrics_path: Path) -> dict:
+    """Stage wall times and total CPU seconds from one run's metrics file."""
+    summary = {}
+    if not metrics_path.exists():
+        return summary
+    with open(metrics_path, "r") as f:
+        records = [json.loads(line) for line in f]
+    for record in records:
+        if record["type"] != "stage":
+            continue
+        name = record["stage"]
+        if name in TRANSCRIPT_STAGES:
+            name = "transcript"
+        if record["parent"] is None:
+            summary["cpu"] = summary.get("cpu", 0.0) + record["cpu_seconds"] + record["child_cpu_seconds"]
+            summary["peak_rss_mb"] = max(summary.get("peak_rss_mb", 0.0),
+                                         record["child_peak_rss_bytes"] / 2**20)
+        if record["parent"] is None or name == "whisper":
+            summary[name] = summary.get(name, 0.0) + record["wall_seconds"]
+    return summary
+
+def run_case(audio_path: Path, work_dir: Path, env: dict, extra_args: list) -> dict:
+    """Runs create_video.py once with fresh caches and returns its timings."""
+    run_dir = Path(tempfile.mkdtemp(prefix="run_", dir=work_dir))
+    metrics_path = run_dir / "metrics.jsonl"
+    env = dict(env, NOTEBOOKLM_CACHE_DIR=str(run_dir / "cache"),
+               NOTEBOOKLM_METRICS_FILE=str(metrics_path))
+    command = [
+        sys.executable, str(REPO_DIR / "create_video.py"), str(audio_path),
+        "--output", str(run_dir / "video.mp4"),
+        "--output-dir", str(run_dir),
+        "--auto-approve",
+        *extra_args,
+    ]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if result.returncode != 0 or not (run_dir / "video.mp4").exists():
+        tail = "\n".join((result.stdout + result.stderr).strip().splitlines()[-15:])
+        raise RuntimeError(f"Pipeline failed for {audio_path.name}:\n{tail}")
+
+    summary = summarise_metrics(metrics_path)
+    summary["total"] = total
+    shutil.rmtree(run_dir, ignore_errors=True)
+    return summary
+
+def _median(runs: list) -> dict:
+    keys = {key for run in runs for key in run}
+    return {key: statistics.median(run.get(key, 0.0) for run in runs) for key in keys}
+
+def _format_cell(value: float, baseline: float = None) -> str:
+    if value is None:
+        return "-"
+    text = f"{value:.2f}s"
+    if baseline:
+        text += f" ({(value - baseline) / baseline * 100:+.0f}%)"
+    return text
+
+def print_table(results: dict, baseline: dict = None):
+    """Prints seconds per stage for every case, with the change from baseline when given."""
+    width = 20 if baseline else 11
+    print(f"\n{'Case':<16}" + "".join(f"{heading:>{width}}" for heading, _ in COLUMNS)
+          + f"{'Peak RSS':>10}")
+    for case, values in results.items():
+        previous = (baseline or {}).get(case, {})
+        cells = [_format_cell(values.get(key), previous.get(key)) for _, key in COLUMNS]
+        print(f"{case:<16}" + "".join(f"{cell:>{width}}" for cell in cells)
+              + f"{values.get('peak_rss_mb', 0):>8.0f}MB")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the video pipeline offline on synthetic episodes",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 benchmarks/run_benchmarks.py --save benchmarks/results/baseline.json
+  python3 benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+  python3 benchmarks/run_benchmarks.py --durations 10 --args "--loop-segment 30"
+  python3 benchmarks/run_benchmarks.py --whisper real --durations 1
+        """
+    )
+    parser.add_argument("--durations", default=",".join(str(m) for m in DURATIONS_MINUTES),
+                        help="Episode lengths in minutes (default: 1,10,50)")
+    parser.add_argument("--audio", choices=sorted(AUDIO_SOURCES), default="speech",
+                        help="Synthetic audio source (default: speech)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the median is reported")
+    parser.add_argument("--image-latency", type=float, default=1.0, metavar="SECONDS",
+                        help="Response delay of the stub image API (default: 1.0)")
+    parser.add_argument("--whisper", choices=("fake", "real"), default="fake",
+                        help="fake: benchmarks/fake_whisper.py; real: whisper.cpp from $WHISPER_DIR")
+    parser.add_argument("--whisper-rtf", type=float, default=0.005, metavar="RTF",
+                        help="Seconds the fake whisper spends per second of audio (default: 0.005)")
+    parser.add_argument("--args", default="", help="Extra create_video.py arguments, e.g. \"--loop-segment 30\"")
+    parser.add_argument("--media-dir", default=str(REPO_DIR / "benchmarks" / "media"),
+                        help="Where synthetic audio is generated and kept (default: benchmarks/media)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results to a JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="Show changes against results saved with --save")
+    args = parser.parse_args()
+
+    durations = [float(value) for value in args.durations.split(",") if value.strip()]
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)["results"]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="notebooklm_bench_"))
+    stub = StubOpenRouter(delay=args.image_latency).start()
+    env = dict(os.environ, OPENROUTER_BASE_URL=stub.base_url, OPENROUTER_API_KEY="benchmark",
+               WHISPER_SERVER_URL="")
+    if args.whisper == "fake":
+        env.update(WHISPER_DIR=str(make_fake_whisper_dir(work_dir)), WHISPER_MODEL="base.en",
+                   FAKE_WHISPER_RTF=str(args.whisper_rtf))
+
+    results = {}
+    try:
+        for minutes in durations:
+            audio_path = generate_audio(args.audio, minutes, Path(args.media_dir))
+            case = f"{args.audio} {minutes:g}min"
+            runs = []
+            for i in range(args.repeat):
+                print(f"Running {case} ({i + 1}/{args.repeat})...")
+                runs.append(run_case(audio_path, work_dir, env, shlex.split(args.args)))
+            results[case] = _median(runs)
+    finally:
+        stub.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(results, baseline)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "settings": {"whisper": args.whisper, "whisper_rtf": args.whisper_rtf,
+                             "image_latency": args.image_latency, "args": args.args,
+                             "repeat": args.repeat, "cpu_count": os.cpu_count()},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Theme Extraction Benchmark
+
+Times src/themes.py's extract_themes, which builds the cover art prompt from
+the whole transcript, on synthetic conversational transcripts of 1, 10 and 50
+minutes (or on real transcripts given as arguments). Extraction sits on the
+critical path between transcription and the cover art request, so it has to
+stay within a few tens of milliseconds even for the longest episodes; the
+script exits non-zero when the median of any case is over --budget-ms.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_DIR / "src"))
+
+from prompt_loader import PROMPT_THEME_CHARS
+from themes import extract_themes
+
+DURATIONS_MINUTES = (1, 10, 50)
+
+# NotebookLM hosts speak at roughly this rate
+WORDS_PER_MINUTE = 170
+
+FILLER = ("so", "and", "you know", "I mean", "right", "yeah", "it's", "that's", "really",
+          "the", "a", "of", "to", "in", "we", "they", "is", "was", "kind of", "like")
+TOPICS = (
+    "markets valuation hype bubble investors startups funding revenue profits",
+    "compute chips energy datacenters power cooling hardware supply shortages",
+    "training inference models benchmarks research scaling parameters datasets",
+    "adoption productivity workers companies automation jobs customers tools",
+    "regulation policy governments safety copyright lawsuits rules oversight",
+)
+TOPIC_MINUTES = 6
+
+def synthetic_transcript(minutes: float, seed: int = 1) -> str:
+    """A deterministic transcript of filler and topic words, one sentence per line."""
+    rng = random.Random(seed)
+    words_left = int(minutes * WORDS_PER_MINUTE)
+    lines = []
+    while words_left > 0:
+        minute = (minutes * WORDS_PER_MINUTE - words_left) / WORDS_PER_MINUTE
+        topic = TOPICS[int(minute // TOPIC_MINUTES) % len(TOPICS)].split()
+        length = rng.choice((2, 8, 12, 15, 20, 25))
+        words = [rng.choice(topic) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(length)]
+        lines.append(" ".join(words).capitalize() + rng.choice((".", ".", ".", "?", "!")))
+        words_left -= length
+    return "\n".join(lines)
+
+def time_extraction(text: str, repeat: int) -> list:
+    """Milliseconds per extract_themes call, one entry per repeat."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extract_themes(text, PROMPT_THEME_CHARS)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("transcripts", nargs="*", help="Real transcript files to time instead of synthetic ones")
+    parser.add_argument("--durations", default=",".join(str(m) for m in DURATIONS_MINUTES),
+                        help="Synthetic transcript lengths in minutes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per case (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=30.0,
+                        help="Fail when a median is over this (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.transcripts:
+        cases = [(Path(path).name, Path(path).read_text()) for path in args.transcripts]
+    else:
+        cases = [(f"{float(m):g} min", synthetic_transcript(float(m))) for m in args.durations.split(",")]
+
+    print(f"{'Transcript':<24}{'Chars':>10}{'Median':>10}{'Max':>10}")
+    over_budget = False
+    for name, text in cases:
+        timings = time_extraction(text, args.repeat)
+        median = statistics.median(timings)
+        over_budget |= median > args.budget_ms
+        print(f"{name:<24}{len(text):>10,}{median:>8.1f}ms{max(timings):>8.1f}ms")
+    print(f"\nThemes of the last transcript:\n{extract_themes(cases[-1][1], PROMPT_THEME_CHARS)}")
+
+    if over_budget:
+        print(f"\n❌ Median over the {args.budget_ms:g} ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,11 @@ transcription, and output customization.
 """
 
 import argparse
+import shutil
 import sys
 import os
+import tempfile
+import threading
 from pathlib import Path
 
 # Add src to path for imports
@@ -16,7 +19,13 @@ sys.path.append(str(Path(__file__).parent / "src"))
 
 from transcribe import transcribe_audio
 from cover_art import generate_cover_art
-from video import create_video as create_video_ffmpeg
+from video import RENDITIONS, create_video as create_video_ffmpeg
+from audiogram import AUDIOGRAM_STYLES, render_audiogram
+from subtitles import parse_srt
+from chapters import detect_chapters, format_chapter_list, write_ffmetadata
+from probe import probe_audio
+from prompt_loader import PROMPT_PREFIX_SECONDS
+from pipeline import Pipeline, StageSkipped
 
 def create_video_with_options(
     audio_path: str,
@@ -25,7 +34,22 @@ def create_video_with_options(
     custom_prompt: str = None,
     skip_transcription: bool = False,
     auto_approve: bool = False,
-    output_dir: str = "data"
+    output_dir: str = "data",
+    loop_segment_seconds: float = None,
+    chunk_seconds: float = None,
+    transcribe_workers: int = None,
+    prefix_seconds: float = None,
+    full_transcript: bool = False,
+    new_variant: bool = False,
+    whisper_model: str = None,
+    whisper_threads: int = None,
+    whisper_processors: int = None,
+    transcript_path: str = None,
+    on_checkpoint=None,
+    renditions: list = None,
+    audiogram: str = None,
+    subtitles: bool = False,
+    chapters: bool = False
 ):
     """
     Create a video with various customization options.
@@ -38,9 +62,28 @@ def create_video_with_options(
         skip_transcription: Skip transcription if transcript already exists
         auto_approve: Skip user approval and proceed automatically
         output_dir: Directory for output files
+        loop_segment_seconds: Encode a still-image segment of this length once and loop it (optional)
+        chunk_seconds: Transcribe in parallel chunks of about this length, cut at silences (optional)
+        transcribe_workers: Number of parallel whisper processes for chunked transcription (optional)
+        prefix_seconds: Only transcribe this many seconds up front to prompt cover art (optional)
+        full_transcript: In prefix mode, also transcribe the whole episode in the background
+        new_variant: Request a fresh image even if this prompt's cover art is cached
+        whisper_model: Whisper model name or path; picked from duration and cores when omitted
+        whisper_threads: Threads per whisper processor (optional)
+        whisper_processors: whisper-cli processors splitting the audio (optional)
+        transcript_path: Use this existing transcript instead of transcribing (optional)
+        on_checkpoint: Called as on_checkpoint(stage, path) when the transcript, generated
+            cover art or video is finished, so a later run can resume from it (optional)
+        renditions: Write these renditions (e.g. ["1080p", "720p", "audio"]) in one ffmpeg
+            pass, named after output_path, instead of a single video (optional)
+        audiogram: Animate the video with bars that follow the audio, in this style
+            ("spectrum" or "waveform"); needs NumPy (optional)
+        subtitles: Mux the timed transcript into the video as soft subtitles
+        chapters: Add MP4 chapters at topic shifts in the timed transcript
     """
     
     audio_file = Path(audio_path)
+    checkpoint = on_checkpoint or (lambda stage, path: None)
     if not audio_file.exists():
         print(f"❌ Error: Audio file not found: {audio_path}")
         return False
@@ -52,98 +95,246 @@ def create_video_with_options(
         output_path = Path(output_dir) / f"{audio_file.stem}_video.mp4"
     else:
         output_path = Path(output_path)
-    
-    transcript_path = audio_file.with_suffix('.txt')
-    transcript_content = ""
-    
+
+    # Independent stages run concurrently: probing, transcription and (with
+    # --prompt) the cover art request do not wait for each other.
+    pipeline = Pipeline()
+    whisper = {"model": whisper_model, "threads": whisper_threads, "processors": whisper_processors}
+    # Subtitles and chapters need whisper's segment timings, not just the text
+    timed = subtitles or chapters
+    prep_dir = tempfile.mkdtemp(prefix="notebooklm_audio_")
+    # The MP4 audio prepared by the full transcription, if any. Without
+    # subtitles or chapters, encode only waits for it when the input has to
+    # be transcoded, which is not known until the probe has run.
+    prepared_audio = {}
+    transcription_finished = threading.Event()
+
+    def probe(results):
+        # Probe once and share the results with every stage
+        audio_info = probe_audio(str(audio_file))
+        duration = f"{audio_info.duration / 60:.1f} min" if audio_info.duration else "unknown length"
+        print(f"🔎 {audio_info.codec}, {audio_info.sample_rate} Hz, {audio_info.channels} ch, {duration}")
+        return audio_info
+
+    def transcribe_full(results):
+        # Audio that must be transcoded for the MP4 is prepared by the
+        # transcription pass, so the input is only decoded once.
+        audio_info = results["probe"]
+        mux_audio_path = None
+        if not audio_info.mp4_compatible:
+            mux_audio_path = str(Path(prep_dir) / f"{audio_file.stem}.m4a")
+        try:
+            transcript_path = transcribe_audio(str(audio_file), audio_info=audio_info,
+                                               mux_audio_path=mux_audio_path,
+                                               chunk_seconds=chunk_seconds,
+                                               workers=transcribe_workers, subtitles=timed, **whisper)
+            prepared_audio["path"] = mux_audio_path
+        finally:
+            transcription_finished.set()
+        print(f"✅ Transcription saved: {transcript_path}")
+        checkpoint("transcript", transcript_path)
+        subtitles_path = str(Path(transcript_path).with_suffix(".srt")) if timed else None
+        with open(transcript_path, 'r') as f:
+            return {"text": f.read(), "subtitles_path": subtitles_path}
+
+    def transcribe_prefix(results):
+        prefix_path = transcribe_audio(str(audio_file), audio_info=results["probe"],
+                                       max_seconds=prefix_seconds, **whisper)
+        with open(prefix_path, 'r') as f:
+            return {"text": f.read()}
+
+    def read_transcript(results):
+        # Timings come from the .srt written next to the transcript, if any
+        subtitles_path = transcript_path.with_suffix(".srt")
+        with open(transcript_path, 'r') as f:
+            return {"text": f.read(),
+                    "subtitles_path": str(subtitles_path) if subtitles_path.exists() else None}
+
+    pipeline.add("probe", probe)
+
     # Step 1: Transcription (only if needed for cover art generation)
-    if cover_art_path:
+    use_existing_transcript = skip_transcription or transcript_path is not None
+    transcript_path = Path(transcript_path) if transcript_path else audio_file.with_suffix('.txt')
+    prompt_source = None
+    full_stage = None
+    if prefix_seconds and timed and not full_transcript:
+        print("📝 Subtitles and chapters need the full transcript, transcribing it in the background")
+        full_transcript = True
+    if cover_art_path and not timed:
         print("⏭️ Step 1: Skipping transcription (using provided cover art)")
-    elif skip_transcription and transcript_path.exists():
+    elif custom_prompt and not timed:
+        print("⏭️ Step 1: Skipping transcription (using custom prompt)")
+    elif use_existing_transcript and transcript_path.exists():
         print(f"⏭️ Step 1: Using existing transcript: {transcript_path}")
-        try:
-            with open(transcript_path, 'r') as f:
-                transcript_content = f.read()
-        except Exception as e:
-            print(f"❌ Could not read transcript: {e}")
-            return False
+        pipeline.add("transcript", read_transcript)
+        prompt_source = "transcript"
+        full_stage = "transcript" if timed else None
+    elif prefix_seconds and not cover_art_path:
+        print(f"\n📝 Step 1: Transcribing first {prefix_seconds:g}s for cover art")
+        pipeline.add("prefix_transcript", transcribe_prefix, deps=["probe"])
+        prompt_source = "prefix_transcript"
+        if full_transcript:
+            print("📝 Full transcription runs in the background")
+            pipeline.add("full_transcript", transcribe_full, deps=["probe"])
+            full_stage = "full_transcript"
     else:
         print("\n📝 Step 1: Transcribing Audio")
-        try:
-            transcript_path = transcribe_audio(str(audio_file))
-            print(f"✅ Transcription saved: {transcript_path}")
-            with open(transcript_path, 'r') as f:
-                transcript_content = f.read()
-        except Exception as e:
-            print(f"❌ Transcription failed: {e}")
-            return False
-    
+        pipeline.add("transcript", transcribe_full, deps=["probe"])
+        full_stage = "transcript"
+        if not custom_prompt and not cover_art_path:
+            prompt_source = "transcript"
+
     # Step 2: Cover Art
-    print("\n🎨 Step 2: Cover Art")
-    
-    if cover_art_path:
-        # Use provided cover art
-        cover_art_file = Path(cover_art_path)
-        if not cover_art_file.exists():
-            print(f"❌ Error: Cover art file not found: {cover_art_path}")
-            return False
-        print(f"🖼️ Using provided cover art: {cover_art_file}")
-        final_cover_art = str(cover_art_file)
-    else:
+    def cover_art(results):
+        print("\n🎨 Step 2: Cover Art")
+        if cover_art_path:
+            # Use provided cover art
+            cover_art_file = Path(cover_art_path)
+            if not cover_art_file.exists():
+                raise FileNotFoundError(f"Cover art file not found: {cover_art_path}")
+            print(f"🖼️ Using provided cover art: {cover_art_file}")
+            return str(cover_art_file)
+
         # Generate new cover art
         try:
             if custom_prompt:
                 print(f"🎯 Using custom prompt: {custom_prompt[:100]}...")
                 # Temporarily replace the transcript with custom prompt
-                final_cover_art = generate_cover_art(custom_prompt)
+                final_cover_art = generate_cover_art(custom_prompt, output_dir, new_variant=new_variant,
+                                                     custom_prompt=True)
             else:
                 print("🤖 Generating AI cover art from transcript...")
-                final_cover_art = generate_cover_art(transcript_content)
-            
+                final_cover_art = generate_cover_art(results[prompt_source]["text"], output_dir,
+                                                     new_variant=new_variant)
             print(f"✅ Cover art generated: {final_cover_art}")
+            checkpoint("cover_art", final_cover_art)
+            return final_cover_art
         except Exception as e:
             print(f"❌ Cover art generation failed: {e}")
             print("🔄 Falling back to placeholder...")
             placeholder_path = Path("data/placeholder.png")
             if placeholder_path.exists():
-                final_cover_art = str(placeholder_path)
-            else:
-                print("❌ No fallback cover art available")
-                return False
-    
+                return str(placeholder_path)
+            raise FileNotFoundError("No fallback cover art available")
+
+    pipeline.add("cover_art", cover_art, deps=[prompt_source] if prompt_source else [])
+
     # Step 3: User Approval
-    if not auto_approve:
+    def approve(results):
+        if auto_approve:
+            print(f"\n⚡ Step 3: Auto-approved, proceeding...")
+            return True
+
         print(f"\n👀 Step 3: Review")
-        print(f"🎨 Cover art: {final_cover_art}")
+        print(f"🎨 Cover art: {results['cover_art']}")
         print(f"🎬 Output will be: {output_path}")
-        
         try:
             approval = input("\n🤔 Proceed with video creation? (y/n): ").strip().lower()
-            if approval != 'y':
-                print("❌ Video creation cancelled by user")
-                return False
         except KeyboardInterrupt:
-            print("\n❌ Video creation cancelled by user")
-            return False
-    else:
-        print(f"\n⚡ Step 3: Auto-approved, proceeding...")
-    
+            approval = ""
+            print()
+        if approval != 'y':
+            raise StageSkipped("Video creation cancelled by user")
+        return True
+
+    pipeline.add("approve", approve, deps=["cover_art"], inline=True)
+
     # Step 4: Video Creation
-    print(f"\n🎬 Step 4: Creating Video")
-    try:
-        create_video_ffmpeg(final_cover_art, str(audio_file), str(output_path))
-        
+    def prepare_subtitles_and_chapters(results):
+        # Returns the (subtitles, chapters) files to mux, each None when not wanted
+        timed_transcript = results.get(full_stage) if full_stage else None
+        srt = timed_transcript and timed_transcript.get("subtitles_path")
+        if not timed:
+            return None, None
+        if not srt:
+            print("⚠️ No timed transcript available, the video will have no subtitles or chapters")
+            return None, None
+        chapters_path = None
+        if chapters:
+            episode_chapters = detect_chapters(parse_srt(srt), results["probe"].duration)
+            if episode_chapters:
+                chapters_path = write_ffmetadata(episode_chapters, Path(prep_dir) / "chapters.txt")
+                print(f"📑 {len(episode_chapters)} chapters (for the YouTube description):")
+                print(format_chapter_list(episode_chapters))
+            else:
+                print("📑 No clear topic shifts found, adding no chapters")
+        return (srt if subtitles else None), chapters_path
+
+    def encode(results):
+        video_audio = str(audio_file)
+        video_audio_info = results["probe"]
+        if full_stage and not timed and not video_audio_info.mp4_compatible:
+            # A failed transcription only costs us the prepared audio: encode
+            # then transcodes the original itself
+            transcription_finished.wait()
+        if prepared_audio.get("path"):
+            video_audio = prepared_audio["path"]
+            video_audio_info = None
+
+        print(f"\n🎬 Step 4: Creating Video")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        subtitles_path, chapters_path = prepare_subtitles_and_chapters(results)
+        if audiogram:
+            render_audiogram(results["cover_art"], video_audio, str(output_path),
+                             audio_info=video_audio_info, style=audiogram,
+                             subtitles_path=subtitles_path, chapters_path=chapters_path)
+            outputs = None
+        else:
+            outputs = create_video_ffmpeg(results["cover_art"], video_audio, str(output_path),
+                                          loop_segment_seconds=loop_segment_seconds,
+                                          audio_info=video_audio_info, renditions=renditions,
+                                          subtitles_path=subtitles_path, chapters_path=chapters_path)
+
         # Show results
-        size = output_path.stat().st_size
-        size_mb = size / (1024 * 1024)
-        print(f"\n🎉 Success! Video created:")
-        print(f"📁 Location: {output_path}")
-        print(f"📊 Size: {size:,} bytes ({size_mb:.1f} MB)")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Video creation failed: {e}")
-        return False
+        if outputs:
+            print(f"\n🎉 Success! {len(outputs)} renditions created:")
+            for name, path in outputs.items():
+                size = path.stat().st_size
+                print(f"📁 {name:>6}: {path} ({size / (1024 * 1024):.1f} MB)")
+            final_path = str(next(iter(outputs.values())))
+        else:
+            size = output_path.stat().st_size
+            size_mb = size / (1024 * 1024)
+            print(f"\n🎉 Success! Video created:")
+            print(f"📁 Location: {output_path}")
+            print(f"📊 Size: {size:,} bytes ({size_mb:.1f} MB)")
+            final_path = str(output_path)
+        checkpoint("video", final_path)
+        return final_path
+
+    if full_stage and not timed:
+        # Only the prepared audio is needed, and only for some inputs (see above)
+        pipeline.add("encode", encode, deps=["approve", "probe"])
+    elif full_stage == "full_transcript":
+        pipeline.add("encode", encode, deps=["approve", "probe"], after=[full_stage])
+    else:
+        pipeline.add("encode", encode, deps=["approve", "probe", *([full_stage] if full_stage else [])])
+
+    try:
+        pipeline.run()
+    finally:
+        shutil.rmtree(prep_dir, ignore_errors=True)
+
+    stage_labels = {
+        "probe": "Could not read audio file",
+        "transcript": "Transcription failed",
+        "prefix_transcript": "Transcription failed",
+        "full_transcript": "Background transcription failed",
+        "cover_art": "Cover art failed",
+        "approve": "Review failed",
+        "encode": "Video creation failed",
+    }
+    for name, error in pipeline.errors.items():
+        if isinstance(error, StageSkipped):
+            if name == "approve":
+                print(f"❌ {error}")
+            continue
+        icon = "⚠️" if name == "full_transcript" else "❌"
+        print(f"{icon} {stage_labels[name]}: {error}")
+
+    pipeline.report()
+    return pipeline.succeeded("encode")
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -182,15 +373,51 @@ Skip transcription (use existing):
     parser.add_argument("-o", "--output", help="Output video path (default: auto-generated)")
     parser.add_argument("--cover-art", help="Use existing cover art image instead of generating")
     parser.add_argument("--prompt", help="Custom prompt for AI cover art generation")
+    parser.add_argument("--new-variant", action="store_true",
+                       help="Generate new cover art even if this prompt was used before")
     parser.add_argument("--skip-transcription", action="store_true", 
                        help="Skip transcription if transcript file already exists")
     parser.add_argument("--auto-approve", action="store_true",
                        help="Skip user approval and proceed automatically")
     parser.add_argument("--output-dir", default="data",
                        help="Directory for output files (default: data)")
+    parser.add_argument("--loop-segment", type=float, metavar="SECONDS",
+                       help="Encode a still-image segment of SECONDS once and repeat it with stream copy")
+    parser.add_argument("--renditions", type=lambda value: [v.strip() for v in value.split(",") if v.strip()],
+                       metavar="LIST",
+                       help=f"Comma-separated renditions to write in one pass "
+                            f"({', '.join(RENDITIONS)}), e.g. 1080p,720p,audio")
+    parser.add_argument("--audiogram", nargs="?", const="spectrum", choices=AUDIOGRAM_STYLES,
+                       help="Animate the cover art with bars that follow the audio "
+                            "(spectrum, the default, or waveform); needs NumPy")
+    parser.add_argument("--subtitles", action="store_true",
+                       help="Add the transcript as a soft subtitle track (also writes .srt and .vtt files)")
+    parser.add_argument("--chapters", action="store_true",
+                       help="Add chapters at topic shifts in the transcript")
+    parser.add_argument("--chunk-seconds", type=float, metavar="SECONDS",
+                       help="Transcribe in parallel chunks of about SECONDS, split at silences")
+    parser.add_argument("--transcribe-workers", type=int, metavar="N",
+                       help="Parallel whisper processes for chunked transcription (default: half the cores)")
+    parser.add_argument("--whisper-model", metavar="NAME",
+                       help="Whisper model name (e.g. base.en) or path (default: picked from duration and cores)")
+    parser.add_argument("--whisper-threads", type=int, metavar="N",
+                       help="Threads per whisper processor (default: cores / processors)")
+    parser.add_argument("--whisper-processors", type=int, metavar="N",
+                       help="whisper-cli processors, each taking a slice of the audio (default: auto)")
+    parser.add_argument("--prefix-seconds", type=float, nargs="?", const=PROMPT_PREFIX_SECONDS,
+                       metavar="SECONDS",
+                       help=f"Only transcribe the first SECONDS (default: {PROMPT_PREFIX_SECONDS}) "
+                            "before generating cover art")
+    parser.add_argument("--full-transcript", action="store_true",
+                       help="With --prefix-seconds, also transcribe the whole episode in the background")
     parser.add_argument("--version", action="version", version="Video Creator v1.0.0")
     
     args = parser.parse_args()
+    unknown = [name for name in args.renditions or [] if name not in RENDITIONS]
+    if unknown:
+        parser.error(f"unknown renditions: {', '.join(unknown)} (choose from {', '.join(RENDITIONS)})")
+    if args.audiogram and (args.renditions or args.loop_segment):
+        parser.error("--audiogram cannot be combined with --renditions or --loop-segment")
     
     # Create video with options
     success = create_video_with_options(
@@ -200,7 +427,20 @@ Skip transcription (use existing):
         custom_prompt=args.prompt,
         skip_transcription=args.skip_transcription,
         auto_approve=args.auto_approve,
-        output_dir=args.output_dir
+        output_dir=args.output_dir,
+        loop_segment_seconds=args.loop_segment,
+        chunk_seconds=args.chunk_seconds,
+        transcribe_workers=args.transcribe_workers,
+        prefix_seconds=args.prefix_seconds,
+        full_transcript=args.full_transcript,
+        new_variant=args.new_variant,
+        whisper_model=args.whisper_model,
+        whisper_threads=args.whisper_threads,
+        whisper_processors=args.whisper_processors,
+        renditions=args.renditions,
+        audiogram=args.audiogram,
+        subtitles=args.subtitles,
+        chapters=args.chapters
     )
     
     if not success:
@@ -0,0 +1,323 @@
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from probe import AudioInfo, probe_audio
+    from process_runner import print_progress, run_streaming
+    from subtitles import mux_args
+    import metrics
+except ImportError:
+    from src.probe import AudioInfo, probe_audio
+    from src.process_runner import print_progress, run_streaming
+    from src.subtitles import mux_args
+    from src import metrics
+
+# "spectrum": frequency bars from an FFT of each frame's audio.
+# "waveform": the loudness (RMS) of the last BAR_COUNT frames, scrolling.
+AUDIOGRAM_STYLES = ("spectrum", "waveform")
+
+AUDIOGRAM_WIDTH = 1280
+AUDIOGRAM_HEIGHT = 720
+AUDIOGRAM_FPS = 15
+AUDIOGRAM_PRESET = "superfast"
+
+# Audio is decoded to mono float32 at this rate; it must be divisible by the fps
+ANALYSIS_SAMPLE_RATE = 22050
+
+BAR_COUNT = 48
+BAR_FILL = 0.7                  # Share of each bar slot that is bar, the rest is gap
+BAR_AREA_HEIGHT = 0.22          # Share of the frame height used by the bars
+BAR_AREA_WIDTH = 0.8            # Share of the frame width used by the bars
+BAR_COLOR = (255, 255, 255)
+BAR_OPACITY = 0.85
+SPECTRUM_MIN_HZ = 50
+SPECTRUM_MAX_HZ = 8000
+LEVEL_FLOOR_DB = -60.0          # Levels at or below this are drawn as empty bars
+LEVEL_DECAY = 0.85              # A bar falls to at most this share of its previous height per frame
+
+# Frames analysed, drawn and written to ffmpeg per batch
+FRAMES_PER_BATCH = 30
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Audiogram rendering needs NumPy: pip install numpy")
+
+def _load_background(image_path: Path, width: int, height: int) -> "np.ndarray":
+    """Decodes the cover art once, fitted and centred on a black width x height frame."""
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", str(image_path), "-frames:v", "1",
+         "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+         "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.uint8).reshape(height, width, 3)
+
+def _to_level(values: "np.ndarray") -> "np.ndarray":
+    """Maps linear amplitudes (1.0 = full scale) to bar heights between 0 and 1."""
+    db = 20 * np.log10(np.maximum(values, 1e-9))
+    return np.clip(1 - db / LEVEL_FLOOR_DB, 0.0, 1.0)
+
+class LevelAnalyzer:
+    """
+    Turns batches of per-frame audio windows into per-frame bar levels, with
+    one FFT or RMS over the whole batch at a time.
+    """
+
+    def __init__(self, style: str, samples_per_frame: int, sample_rate: int, bars: int = BAR_COUNT):
+        self.style = style
+        self.bars = bars
+        self.window = np.hanning(samples_per_frame).astype(np.float32)
+        # Normalises a full-scale sine to an FFT magnitude of 1.0
+        self.scale = 2.0 / self.window.sum()
+
+        frequencies = np.fft.rfftfreq(samples_per_frame, 1.0 / sample_rate)
+        edges = np.geomspace(SPECTRUM_MIN_HZ, SPECTRUM_MAX_HZ, bars + 1)
+        starts = np.searchsorted(frequencies, edges[:-1])
+        # Low bands narrower than one FFT bin share a bin with their neighbour
+        self.band_stop = int(np.searchsorted(frequencies, edges[-1]))
+        self.band_starts = np.minimum(np.maximum.accumulate(starts), self.band_stop - 1)
+
+        self._previous = np.zeros(bars, dtype=np.float32)
+        self._history = np.zeros(bars - 1, dtype=np.float32)
+
+    def levels(self, frames: "np.ndarray") -> "np.ndarray":
+        """(frames, samples) audio to (frames, bars) levels between 0 and 1."""
+        if self.style == "spectrum":
+            spectrum = np.abs(np.fft.rfft(frames * self.window, axis=1)) * self.scale
+            spectrum = spectrum[:, :self.band_stop]
+            # Loudest bin per band; duplicate starts make reduceat repeat a bin
+            levels = _to_level(np.maximum.reduceat(spectrum, self.band_starts, axis=1))
+            # Let bars fall smoothly instead of flickering, compared with the
+            # previous frame (the last frame of the previous batch for the first)
+            previous = np.vstack([self._previous, levels[:-1]])
+            levels = np.maximum(levels, previous * LEVEL_DECAY)
+            self._previous = levels[-1]
+            return levels
+
+        # Each frame shows the RMS of the last `bars` frames, newest on the right
+        rms = _to_level(np.sqrt(np.mean(np.square(frames), axis=1)) * np.sqrt(2))
+        series = np.concatenate([self._history, rms])
+        self._history = series[-(self.bars - 1):]
+        return np.lib.stride_tricks.sliding_window_view(series, self.bars)
+
+class BarRenderer:
+    """
+    Draws bars over a fixed background for a whole batch of frames at once.
+    Only the bar area is redrawn; the rest of each frame buffer keeps the
+    background it was filled with.
+
+    Pixels are handled as rows of width * 3 bytes, and a bar pixel is the
+    background XOR a precomputed difference, so drawing a batch is a compare,
+    a multiply and an XOR over plain uint8 arrays.
+    """
+
+    def __init__(self, background: "np.ndarray", bars: int = BAR_COUNT, mirrored: bool = False,
+                 batch_size: int = FRAMES_PER_BATCH):
+        height, width, _ = background.shape
+        self.area_height = max(2, int(height * BAR_AREA_HEIGHT))
+        self.top = height - self.area_height - int(height * 0.05)
+        self.mirrored = mirrored
+        self.frames = np.repeat(background.reshape(1, height, width * 3), batch_size, axis=0)
+        self.region = self.frames[0, self.top:self.top + self.area_height].copy()
+
+        color = np.tile(np.array(BAR_COLOR, dtype=np.float32), width)
+        bar_pixels = (self.region * (1 - BAR_OPACITY) + color * BAR_OPACITY).astype(np.uint8)
+        self.difference = self.region ^ bar_pixels
+
+        # Which bar every byte of a row belongs to (-1 for gaps and margins)
+        left = (width - int(width * BAR_AREA_WIDTH)) // 2
+        slot = int(width * BAR_AREA_WIDTH) / bars
+        columns = np.arange(width) - left
+        column_bar = np.where(
+            (columns >= 0) & (columns < slot * bars) & (np.mod(columns, slot) < slot * BAR_FILL),
+            (columns // slot).astype(int), -1
+        )
+        self.byte_bar = np.repeat(column_bar, 3)
+        self._mask = np.empty((batch_size, self.area_height, width * 3), dtype=bool)
+
+        rows = np.arange(self.area_height)
+        if mirrored:
+            # Distance from the centre line, doubled to compare with the full bar height
+            self.row_position = (np.abs(2 * rows - (self.area_height - 1))).astype(np.int16)
+        else:
+            self.row_position = (self.area_height - 1 - rows).astype(np.int16)
+
+    def render(self, levels: "np.ndarray") -> "np.ndarray":
+        """Returns the frames for (frames, bars) levels as an (n, height, width * 3) uint8 view."""
+        count = len(levels)
+        heights = np.rint(levels * self.area_height).astype(np.int16)
+        if self.mirrored:
+            # Keep a thin centre line visible through silences
+            heights = np.maximum(heights, 2)
+        byte_heights = np.where(self.byte_bar >= 0, heights[:, np.maximum(self.byte_bar, 0)], -1)
+        # The gather above comes out column-major; every array here is kept
+        # in C order, as mixed layouts make NumPy's loops several times slower
+        byte_heights = np.ascontiguousarray(byte_heights, dtype=np.int16)
+        mask = self._mask[:count]
+        np.less(self.row_position[np.newaxis, :, np.newaxis],
+                byte_heights[:, np.newaxis, :], out=mask)
+
+        area = self.frames[:count, self.top:self.top + self.area_height]
+        np.multiply(mask.view(np.uint8), self.difference, out=area)
+        np.bitwise_xor(area, self.region, out=area)
+        return self.frames[:count]
+
+def _write_frames(decoder: subprocess.Popen, output, analyzer: LevelAnalyzer,
+                  renderer: BarRenderer, samples_per_frame: int, total_frames: int, errors: list):
+    """Reads decoded audio a batch at a time and writes the rendered frames to output."""
+    batch_bytes = FRAMES_PER_BATCH * samples_per_frame * 4
+    written = 0
+    try:
+        while total_frames is None or written < total_frames:
+            data = decoder.stdout.read(batch_bytes)
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) // 4 * 4], dtype=np.float32)
+            count = -(-len(samples) // samples_per_frame)
+            if total_frames is not None:
+                count = min(count, total_frames - written)
+            frames = np.zeros((count, samples_per_frame), dtype=np.float32)
+            frames.flat[:min(len(samples), frames.size)] = samples[:frames.size]
+            output.write(memoryview(renderer.render(analyzer.levels(frames))).cast("B"))
+            written += count
+    except BrokenPipeError:
+        # The encoder exited early; its error is reported by run_streaming
+        pass
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        try:
+            output.close()
+        except BrokenPipeError:
+            pass
+
+def render_audiogram(image_path: str, audio_path: str, output_path: str, audio_info: AudioInfo = None,
+                     style: str = "spectrum", width: int = AUDIOGRAM_WIDTH,
+                     height: int = AUDIOGRAM_HEIGHT, fps: int = AUDIOGRAM_FPS, on_progress=None,
+                     subtitles_path: str = None, chapters_path: str = None):
+    """
+    Creates a video of the cover art with animated bars that follow the audio.
+
+    The audio is decoded once to mono float32 PCM and analysed a batch of
+    frames at a time with NumPy (one FFT or RMS per batch, no per-frame Python
+    loop). The bars are drawn straight into raw RGB frame buffers that are
+    piped to ffmpeg's rawvideo input, so no image files are written.
+
+    Args:
+        image_path (str): Path to the cover art.
+        audio_path (str): Path to the input audio.
+        output_path (str): Path to the output video file.
+        audio_info (AudioInfo): Probe results for audio_path; probed here when omitted.
+        style (str): "spectrum" or "waveform" (see AUDIOGRAM_STYLES).
+        width (int): Video width in pixels.
+        height (int): Video height in pixels.
+        fps (int): Frames per second; must divide ANALYSIS_SAMPLE_RATE.
+        on_progress (callable): Receives encoding progress updates (optional).
+        subtitles_path (str): Subtitles to mux as a soft track (optional).
+        chapters_path (str): ffmetadata file with chapters (optional).
+    """
+    _require_numpy()
+    if style not in AUDIOGRAM_STYLES:
+        raise ValueError(f"Unknown audiogram style '{style}', expected one of {', '.join(AUDIOGRAM_STYLES)}")
+    if ANALYSIS_SAMPLE_RATE % fps:
+        raise ValueError(f"fps must divide {ANALYSIS_SAMPLE_RATE}, got {fps}")
+    image_p = Path(image_path)
+    audio_p = Path(audio_path)
+    if not image_p.exists():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    if not audio_p.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    if audio_info is None:
+        audio_info = probe_audio(str(audio_p))
+
+    duration = audio_info.duration
+    samples_per_frame = ANALYSIS_SAMPLE_RATE // fps
+    total_frames = int(np.ceil(duration * fps)) if duration else None
+    analyzer = LevelAnalyzer(style, samples_per_frame, ANALYSIS_SAMPLE_RATE)
+    renderer = BarRenderer(_load_background(image_p, width, height), mirrored=style == "waveform")
+
+    audio_codec = ['-c:a', 'copy'] if audio_info.mp4_compatible else ['-c:a', 'aac', '-b:a', '192k']
+    extra_inputs, extra_outputs = mux_args(2, subtitles_path, chapters_path)
+    command = [
+        'ffmpeg', '-y',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+        '-video_size', f'{width}x{height}', '-framerate', str(fps),
+        '-i', 'pipe:0',                      # Frames from _write_frames
+        '-i', str(audio_p),
+        *extra_inputs,
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        *extra_outputs,
+        '-c:v', 'libx264',
+        '-preset', AUDIOGRAM_PRESET,
+        '-pix_fmt', 'yuv420p',
+        '-g', str(fps * 10),
+        *audio_codec,
+        '-shortest',
+        *(['-t', f"{duration:.3f}"] if duration else []),
+        str(output_path)
+    ]
+
+    decoder = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', str(audio_p), '-map', '0:a:0', '-ac', '1',
+         '-ar', str(ANALYSIS_SAMPLE_RATE), '-f', 'f32le', 'pipe:1'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    read_fd, write_fd = os.pipe()
+    errors = []
+    writer = threading.Thread(
+        target=_write_frames,
+        args=(decoder, os.fdopen(write_fd, "wb"), analyzer, renderer, samples_per_frame,
+              total_frames, errors),
+        daemon=True
+    )
+
+    print(f"Rendering {style} audiogram at {width}x{height}, {fps} fps... Output will be saved to {output_path}")
+    try:
+        with metrics.stage("audiogram_render", style=style, fps=fps, size=f"{width}x{height}"):
+            writer.start()
+            try:
+                run_streaming(command, "ffmpeg", "Rendering audiogram", duration,
+                              on_progress or print_progress(), stdin=read_fd)
+            finally:
+                # Unblocks the writer if ffmpeg stopped reading
+                os.close(read_fd)
+                writer.join()
+        if errors:
+            raise errors[0]
+        print("Audiogram video created successfully.")
+    except subprocess.CalledProcessError as e:
+        print(f"Error creating audiogram video: {e.stderr}")
+        raise
+    finally:
+        decoder.kill()
+        decoder.wait()
+
+if __name__ == '__main__':
+    # Renders an audiogram and reports how much faster than real time it was
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Render an audiogram video")
+    parser.add_argument("image", help="Cover art image")
+    parser.add_argument("audio", help="Input audio")
+    parser.add_argument("-o", "--output", default="data/audiogram.mp4",
+                        help="Output video (default: data/audiogram.mp4)")
+    parser.add_argument("--style", choices=AUDIOGRAM_STYLES, default="spectrum")
+    parser.add_argument("--fps", type=int, default=AUDIOGRAM_FPS)
+    args = parser.parse_args()
+
+    info = probe_audio(args.audio)
+    start = time.perf_counter()
+    render_audiogram(args.image, args.audio, args.output, info, args.style, fps=args.fps)
+    elapsed = time.perf_counter() - start
+    if info.duration:
+        print(f"{info.duration:.0f}s of audio in {elapsed:.1f}s ({info.duration / elapsed:.1f}x real time)")
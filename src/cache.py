@@ -0,0 +1,137 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from dotenv import load_dotenv
+from pathlib import Path
+
+try:
+    import metrics
+except ImportError:
+    from src import metrics
+
+load_dotenv()
+
+# Root directory for all caches. Override with NOTEBOOKLM_CACHE_DIR.
+CACHE_ROOT = Path(os.getenv("NOTEBOOKLM_CACHE_DIR",
+                            Path.home() / ".cache" / "notebooklm-to-video")).expanduser()
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Temporary files older than this were left behind by a killed process (a
+# cover art download writes one for as long as the request runs)
+STALE_TMP_SECONDS = 6 * 3600
+
+def hash_file(path: str) -> str:
+    """Streaming SHA-256 of a file's content, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    metrics.record_bytes(read=size)
+    return digest.hexdigest()
+
+def cache_key(*parts) -> str:
+    """Combines arbitrary key parts (content hashes, paths, arguments) into one hex key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class FileCache:
+    """
+    A directory of files named by cache key.
+
+    Entries are evicted least-recently-used first once the directory grows
+    past max_bytes, and unconditionally once older than max_age_seconds.
+    Reads refresh an entry's mtime, which is what the LRU order is based on.
+    """
+
+    def __init__(self, name: str, max_bytes: int = None, max_age_seconds: float = None,
+                 root: Path = None):
+        self.name = name
+        self.directory = Path(root or CACHE_ROOT) / name
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def path_for(self, key: str, suffix: str = "") -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str = "") -> Path:
+        """Returns the cached file for key, or None on a miss."""
+        path = self.path_for(key, suffix)
+        try:
+            if self.max_age_seconds and time.time() - path.stat().st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                metrics.record_cache(self.name, hit=False)
+                return None
+            os.utime(path)
+        except FileNotFoundError:
+            # Not cached, or evicted by another process while we looked
+            metrics.record_cache(self.name, hit=False)
+            return None
+        metrics.record_cache(self.name, hit=True)
+        return path
+
+    def put(self, key: str, source_path: str, suffix: str = "") -> Path:
+        """Copies source_path into the cache under key and returns the cached path."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key, suffix)
+        # Copy then rename, so concurrent readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_name)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path = None):
+        """
+        Removes expired entries and stale temporary files, then the least
+        recently used entries until under max_bytes. keep (the entry just
+        stored) is never removed, even if it alone exceeds max_bytes.
+        """
+        if not self.directory.exists():
+            return
+        now = time.time()
+        entries = []
+        for path in self.directory.iterdir():
+            # Other processes may remove files while we scan
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+                if path.name.startswith(".tmp_"):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        path.unlink()
+                    continue
+                if path == keep:
+                    continue
+                if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                    path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        if not self.max_bytes:
+            return
+        total = sum(size for _, size, _ in entries)
+        if keep is not None:
+            try:
+                total += keep.stat().st_size
+            except FileNotFoundError:
+                pass
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
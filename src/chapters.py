@@ -0,0 +1,173 @@
+import math
+import re
+from collections import Counter
+
+# Transcript time is cut into blocks of this length, and a possible chapter
+# boundary between two blocks is scored by how different the words in the
+# CHAPTER_WINDOW_BLOCKS blocks before it are from those after it.
+CHAPTER_BLOCK_SECONDS = 30
+CHAPTER_WINDOW_BLOCKS = 4
+
+MIN_CHAPTER_SECONDS = 120
+MAX_CHAPTERS = 12
+CHAPTER_TITLE_WORDS = 3
+
+# Common English words that say nothing about the topic, plus the filler
+# words of conversational podcasts.
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been
+before being below between both but by can can't cannot could couldn't did didn't do does
+doesn't doing don't down during each even ever every few for from further get gets getting
+go goes going gonna got had hadn't has hasn't have haven't having he he'd he'll he's her
+here here's hers herself him himself his how how's i i'd i'll i'm i've if in into is isn't
+it it's its itself just know let's like lot lots made make makes making many may me might
+more most much must mustn't my myself need no nor not now of off oh okay on once one only
+or other ought our ours ourselves out over own pretty quite rather really right said same
+say says see seem seems shan't she she'd she'll she's should shouldn't so some something
+still such sure take talk talking than that that's the their theirs them themselves then
+there there's these they they'd they'll they're they've thing things think this those
+though through to too two um uh under until up upon us very want was wasn't way we we'd
+we'll we're we've well were weren't what what's when when's where where's whether which
+while who who's whom why why's will with won't would wouldn't yeah yes yet you you'd
+you'll you're you've your yours yourself yourselves actually absolutely exactly basically
+kind sort mean means thats theyre youre dont doesnt isnt
+""".split())
+
+WORD_PATTERN = re.compile(r"[a-z][a-z']+")
+
+def content_words(text: str) -> list:
+    """Lowercased words of text, without stopwords and very short words."""
+    return [word for word in WORD_PATTERN.findall(text.lower())
+            if len(word) > 2 and word not in STOPWORDS]
+
+def _cosine(left: Counter, right: Counter) -> float:
+    if not left or not right:
+        return 0.0
+    dot = sum(count * right[word] for word, count in left.items())
+    norm = math.sqrt(sum(c * c for c in left.values()) * sum(c * c for c in right.values()))
+    return dot / norm
+
+def _depth_scores(similarities: list) -> list:
+    """
+    TextTiling depth of each similarity valley: how far it lies below the
+    nearest peaks on either side. Deep valleys are topic shifts.
+    """
+    depths = []
+    for i, value in enumerate(similarities):
+        left = value
+        for j in range(i - 1, -1, -1):
+            if similarities[j] < left:
+                break
+            left = similarities[j]
+        right = value
+        for j in range(i + 1, len(similarities)):
+            if similarities[j] < right:
+                break
+            right = similarities[j]
+        depths.append((left - value) + (right - value))
+    return depths
+
+def _title(words: Counter, document_frequency: Counter, chapter_count: int) -> str:
+    """The chapter's most distinctive words (TF-IDF against the other chapters)."""
+    scored = sorted(words, key=lambda w: (-words[w] * math.log((1 + chapter_count) / document_frequency[w]), w))
+    return ", ".join(word.capitalize() for word in scored[:CHAPTER_TITLE_WORDS])
+
+def detect_chapters(segments: list, duration: float = None) -> list:
+    """
+    Splits an episode into chapters at topic shifts in its transcript.
+
+    Segment text is grouped into CHAPTER_BLOCK_SECONDS blocks and compared
+    across every block boundary (TextTiling): where the vocabulary before and
+    after a boundary overlaps least, the conversation has moved on. The
+    deepest of those shifts become chapter starts, at least
+    MIN_CHAPTER_SECONDS apart and at most MAX_CHAPTERS chapters in total.
+    Each chapter is titled with its most distinctive words.
+
+    Args:
+        segments (list): Timed transcript segments with "start", "end" and "text".
+        duration (float): Episode duration; defaults to the end of the last segment.
+
+    Returns:
+        list: Chapters as dicts with "start", "end" (seconds) and "title",
+            or an empty list when the episode has no clear topic shifts.
+    """
+    segments = [s for s in segments if s["text"].strip()]
+    if not segments:
+        return []
+    duration = duration or segments[-1]["end"]
+    if duration < 2 * MIN_CHAPTER_SECONDS:
+        return []
+
+    block_count = int(duration // CHAPTER_BLOCK_SECONDS) + 1
+    blocks = [Counter() for _ in range(block_count)]
+    for segment in segments:
+        index = min(int(segment["start"] // CHAPTER_BLOCK_SECONDS), block_count - 1)
+        blocks[index].update(content_words(segment["text"]))
+
+    # similarities[i] compares the blocks before boundary i + 1 with those after it
+    similarities = []
+    for boundary in range(1, block_count):
+        before = sum(blocks[max(0, boundary - CHAPTER_WINDOW_BLOCKS):boundary], Counter())
+        after = sum(blocks[boundary:boundary + CHAPTER_WINDOW_BLOCKS], Counter())
+        similarities.append(_cosine(before, after))
+    depths = _depth_scores(similarities)
+    if not depths:
+        return []
+    mean_depth = sum(depths) / len(depths)
+
+    starts = [0.0]
+    for i in sorted(range(len(depths)), key=lambda i: -depths[i]):
+        if len(starts) >= MAX_CHAPTERS or depths[i] <= mean_depth:
+            break
+        boundary_time = (i + 1) * CHAPTER_BLOCK_SECONDS
+        # Start the chapter with the first segment after the boundary
+        start = next((s["start"] for s in segments if s["start"] >= boundary_time), None)
+        if start is None or duration - start < MIN_CHAPTER_SECONDS:
+            continue
+        if all(abs(start - other) >= MIN_CHAPTER_SECONDS for other in starts):
+            starts.append(start)
+    starts.sort()
+    if len(starts) < 2:
+        return []
+
+    chapters = []
+    for start, end in zip(starts, starts[1:] + [duration]):
+        words = Counter()
+        for segment in segments:
+            if start <= segment["start"] < end:
+                words.update(content_words(segment["text"]))
+        chapters.append({"start": start, "end": end, "words": words})
+
+    document_frequency = Counter()
+    for chapter in chapters:
+        document_frequency.update(set(chapter["words"]))
+    for number, chapter in enumerate(chapters, 1):
+        words = chapter.pop("words")
+        chapter["title"] = _title(words, document_frequency, len(chapters)) or f"Part {number}"
+    return chapters
+
+def _escape_metadata(value: str) -> str:
+    return re.sub(r"([=;#\\\n])", r"\\\1", value)
+
+def write_ffmetadata(chapters: list, path: str, title: str = None) -> str:
+    """Writes chapters as an ffmetadata file for ffmpeg -map_chapters and returns the path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(";FFMETADATA1\n")
+        if title:
+            f.write(f"title={_escape_metadata(title)}\n")
+        for chapter in chapters:
+            f.write("\n[CHAPTER]\nTIMEBASE=1/1000\n"
+                    f"START={int(chapter['start'] * 1000)}\n"
+                    f"END={int(chapter['end'] * 1000)}\n"
+                    f"title={_escape_metadata(chapter['title'])}\n")
+    return str(path)
+
+def format_chapter_list(chapters: list) -> str:
+    """Chapters as "0:00 Title" lines, the format YouTube reads from a video description."""
+    lines = []
+    for chapter in chapters:
+        minutes, seconds = divmod(int(chapter["start"]), 60)
+        hours, minutes = divmod(minutes, 60)
+        stamp = f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+        lines.append(f"{stamp} {chapter['title']}")
+    return "\n".join(lines)
@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from pathlib import Path
+
+try:
+    from process_runner import Progress, run_streaming
+except ImportError:
+    from src.process_runner import Progress, run_streaming
+
+# ffmpeg silencedetect settings. NotebookLM hosts rarely pause for long, so a
+# short minimum silence is enough to find sentence boundaries.
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+
+# How far (as a fraction of the chunk size) a cut may move to land in a silence.
+CUT_SEARCH_FRACTION = 0.25
+
+def find_silences(wav_path: str, noise_db: float = SILENCE_NOISE_DB,
+                  min_seconds: float = SILENCE_MIN_SECONDS, duration: float = None,
+                  on_progress=None) -> list:
+    """
+    Finds silent stretches in an audio file with ffmpeg's silencedetect filter.
+
+    Returns:
+        list: (start, end) tuples in seconds.
+    """
+    command = [
+        "ffmpeg", "-hide_banner",
+        "-i", str(wav_path),
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_seconds}",
+        "-f", "null", "-"
+    ]
+    silences = []
+    start = None
+
+    def on_line(line: str):
+        nonlocal start
+        match = re.search(r"silence_start: (-?[\d.]+)", line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            return
+        match = re.search(r"silence_end: ([\d.]+)", line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+
+    run_streaming(command, "ffmpeg", "Finding silences", duration, on_progress, on_line=on_line)
+    return silences
+
+def plan_chunks(duration: float, silences: list, chunk_seconds: float) -> list:
+    """
+    Splits [0, duration] into chunks of roughly chunk_seconds, moving each cut
+    to the middle of the nearest silence so no word is split in half.
+
+    Returns:
+        list: (start, end) tuples in seconds.
+    """
+    window = chunk_seconds * CUT_SEARCH_FRACTION
+    midpoints = [(start + end) / 2 for start, end in silences]
+
+    cuts = []
+    previous = 0.0
+    target = chunk_seconds
+    while target < duration - window:
+        candidates = [m for m in midpoints if abs(m - target) <= window and m > previous]
+        cut = min(candidates, key=lambda m: abs(m - target)) if candidates else target
+        cuts.append(cut)
+        previous = cut
+        target = cut + chunk_seconds
+
+    bounds = [0.0] + cuts + [duration]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _split_wav(wav_path: Path, cuts: list, chunk_dir: Path, duration: float = None,
+               on_progress=None) -> list:
+    """Splits a PCM WAV at the given cut points with a single stream-copy pass."""
+    pattern = chunk_dir / "chunk_%04d.wav"
+    command = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", str(wav_path)]
+    if cuts:
+        command += ["-f", "segment", "-segment_times", ",".join(f"{c:.3f}" for c in cuts)]
+    else:
+        command += ["-f", "segment", "-segment_time", "1000000"]
+    command += ["-c", "copy", str(pattern)]
+    run_streaming(command, "ffmpeg", "Splitting audio", duration, on_progress)
+    return sorted(chunk_dir.glob("chunk_*.wav"))
+
+def _transcribe_chunk(chunk_path: Path, whisper_executable: Path, model_path: Path,
+                      threads: int, on_progress=None) -> list:
+    """Runs whisper-cli on one chunk and returns its segments with chunk-relative offsets."""
+    output_base = chunk_path.with_suffix('')
+    command = [
+        str(whisper_executable),
+        "--model", str(model_path),
+        "--file", str(chunk_path),
+        "--threads", str(threads),
+        "--output-json",
+        "--output-file", str(output_base)
+    ]
+    run_streaming(command, "whisper", f"Transcribing {chunk_path.name}", on_progress=on_progress)
+
+    with open(output_base.with_suffix(".json"), 'r') as f:
+        data = json.load(f)
+    return [
+        {
+            "start": entry["offsets"]["from"] / 1000,
+            "end": entry["offsets"]["to"] / 1000,
+            "text": entry["text"].strip(),
+        }
+        for entry in data.get("transcription", [])
+    ]
+
+def _combined_progress(chunk_count: int, duration: float, on_progress):
+    """
+    Returns a factory of per-chunk progress callbacks that report the audio
+    transcribed across all chunks as a single "Transcribing" job.
+    """
+    done = [0.0] * chunk_count
+    finished = set()
+    lock = threading.Lock()
+    start = time.monotonic()
+
+    def for_chunk(index: int):
+        if not on_progress:
+            return None
+
+        def callback(progress: Progress):
+            with lock:
+                done[index] = progress.seconds_done
+                if progress.finished:
+                    finished.add(index)
+                update = Progress("Transcribing", sum(done), time.monotonic() - start, duration,
+                                  finished=len(finished) == chunk_count)
+            on_progress(update)
+
+        return callback
+
+    return for_chunk
+
+def transcribe_wav_chunked(wav_path: str, duration: float, whisper_executable: Path,
+                           model_path: Path, output_file_path: str,
+                           chunk_seconds: float, workers: int = None,
+                           temp_dir: str = None, cores: int = None, on_progress=None) -> list:
+    """
+    Transcribes a 16 kHz mono WAV in parallel chunks cut at silences.
+
+    Each chunk gets its own whisper-cli process; the available cores are shared
+    between them through whisper's --threads flag. Segment timestamps are
+    shifted back onto the episode timeline and the text is written to
+    output_file_path, one segment per line like whisper's own --output-txt.
+
+    Args:
+        wav_path (str): Path to the 16 kHz mono WAV.
+        duration (float): Audio duration in seconds.
+        whisper_executable (Path): Path to whisper-cli.
+        model_path (Path): Path to the GGML model.
+        output_file_path (str): Where to write the stitched transcript.
+        chunk_seconds (float): Target chunk length in seconds.
+        workers (int): Number of parallel whisper processes. Defaults to half the cores.
+        temp_dir (str): Directory for the chunk WAVs. Defaults to the system temp dir.
+        cores (int): Cores to share between the workers. Defaults to os.cpu_count().
+        on_progress (callable): Called with a Progress for the silence search,
+            the split and the transcription of all chunks together (optional).
+
+    Returns:
+        list: Segments as dicts with "start", "end" (seconds) and "text".
+    """
+    cores = cores or os.cpu_count() or 1
+    workers = workers or max(1, cores // 2)
+
+    print(f"Looking for silences to split {duration / 60:.1f} min of audio...")
+    silences = find_silences(wav_path, duration=duration, on_progress=on_progress)
+    chunks = plan_chunks(duration, silences, chunk_seconds)
+    workers = min(workers, len(chunks))
+    threads = max(1, cores // workers)
+    print(f"Transcribing {len(chunks)} chunks with {workers} workers x {threads} threads...")
+
+    chunk_dir = Path(tempfile.mkdtemp(prefix="whisper_chunks_", dir=temp_dir))
+    try:
+        chunk_paths = _split_wav(Path(wav_path), [end for _, end in chunks[:-1]], chunk_dir,
+                                 duration, on_progress)
+        chunk_progress = _combined_progress(len(chunk_paths), duration, on_progress)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                lambda i: _transcribe_chunk(chunk_paths[i], whisper_executable, model_path, threads,
+                                            chunk_progress(i)),
+                range(len(chunk_paths))
+            ))
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    segments = []
+    for (chunk_start, _), chunk_segments in zip(chunks, results):
+        for segment in chunk_segments:
+            segments.append({
+                "start": segment["start"] + chunk_start,
+                "end": segment["end"] + chunk_start,
+                "text": segment["text"],
+            })
+
+    with open(output_file_path, 'w') as f:
+        f.write("\n".join(s["text"] for s in segments if s["text"]) + "\n")
+
+    return segments
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Approximate word error rate of hypothesis against reference, computed from
+    a difflib word alignment (fast enough for hour-long transcripts).
+    """
+    ref_words = re.findall(r"[\w']+", reference.lower())
+    hyp_words = re.findall(r"[\w']+", hypothesis.lower())
+    if not ref_words:
+        return 0.0 if not hyp_words else 1.0
+
+    errors = 0
+    matcher = SequenceMatcher(None, ref_words, hyp_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            errors += max(i2 - i1, j2 - j1)
+    return errors / len(ref_words)
+
+if __name__ == '__main__':
+    # Accuracy-vs-speed comparison of single-pass and chunked transcription.
+    import argparse
+    import sys
+    import time
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from transcribe import transcribe_audio
+
+    parser = argparse.ArgumentParser(description="Compare single-pass and chunked transcription")
+    parser.add_argument("audio_file", help="Path to the audio file")
+    parser.add_argument("--chunk-seconds", type=float, default=120, help="Target chunk length (default: 120)")
+    parser.add_argument("--workers", type=int, help="Parallel whisper processes (default: half the cores)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    transcript_path = transcribe_audio(args.audio_file, use_cache=False)
+    single_seconds = time.perf_counter() - start
+    with open(transcript_path, 'r') as f:
+        reference = f.read()
+
+    start = time.perf_counter()
+    transcript_path = transcribe_audio(args.audio_file, chunk_seconds=args.chunk_seconds,
+                                       workers=args.workers, use_cache=False)
+    chunked_seconds = time.perf_counter() - start
+    with open(transcript_path, 'r') as f:
+        chunked = f.read()
+
+    print("\n--- Single-pass vs chunked ---")
+    print(f"Single-pass: {single_seconds:8.1f}s")
+    print(f"Chunked:     {chunked_seconds:8.1f}s  ({single_seconds / chunked_seconds:.2f}x)")
+    print(f"Word error rate vs single-pass: {word_error_rate(reference, chunked):.2%}")
@@ -1,10 +1,14 @@
 import os
 import sys
-import requests
 import base64
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dotenv import load_dotenv
 from pathlib import Path
-import time
 
 # Add the parent directory to path to find prompt_loader
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,20 +16,291 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from prompt_loader import get_image_prompt
+    from cache import CACHE_ROOT, FileCache, cache_key, hash_file
+    from latency import LatencyHistory
+    from openrouter_client import get_client
+    import metrics
 except ImportError:
     from src.prompt_loader import get_image_prompt
+    from src.cache import CACHE_ROOT, FileCache, cache_key, hash_file
+    from src.latency import LatencyHistory
+    from src.openrouter_client import get_client
+    from src import metrics
 
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-def generate_cover_art(transcript: str, output_dir: str = "data") -> str:
+# Using the google/gemini-3-pro-image-preview model for image generation.
+MODEL_NAME = "google/gemini-3-pro-image-preview"
+
+# Models to ask, comma-separated in OPENROUTER_IMAGE_MODELS. The first is the
+# primary; each of the others is asked when the one before it fails (or, with
+# hedging, is slow to answer).
+MODEL_NAMES = [m.strip() for m in os.getenv("OPENROUTER_IMAGE_MODELS", MODEL_NAME).split(",") if m.strip()]
+
+# Hedged requests: once a model has taken longer than this percentile of its
+# recorded latencies, the next model is asked as well and the first image
+# wins. 0 turns hedging off. Until a model has HEDGE_MIN_SAMPLES latencies
+# recorded, it gets HEDGE_DEFAULT_SECONDS.
+HEDGE_PERCENTILE = float(os.getenv("COVER_ART_HEDGE_PERCENTILE", "0"))
+HEDGE_DEFAULT_SECONDS = float(os.getenv("COVER_ART_HEDGE_SECONDS", "90"))
+HEDGE_MIN_SAMPLES = 10
+
+# Latency of every successful image request, per model, for the hedge
+# threshold (see python3 src/latency.py)
+LATENCY_HISTORY = LatencyHistory(os.getenv("COVER_ART_LATENCY_FILE", CACHE_ROOT / "cover_art_latency.json"))
+
+# Generated images keyed by model and prompt. Identical prompts reuse the
+# image instead of paying for another generation.
+COVER_ART_CACHE = FileCache(
+    "cover_art",
+    max_bytes=int(float(os.getenv("COVER_ART_CACHE_MAX_MB", "500")) * 1024 * 1024),
+    max_age_seconds=float(os.getenv("COVER_ART_CACHE_MAX_DAYS", "30")) * 24 * 3600
+)
+
+# Streaming decode of the image response: read size, scan overlap between
+# chunks and how much of a bad response to show in error messages.
+STREAM_CHUNK_SIZE = 64 * 1024
+SCAN_OVERLAP = 1024
+ERROR_SNIPPET_SIZE = 2048
+
+# The first image's data URL, e.g. "images":[{"type":"image_url","image_url":{"url":"data:image/png;base64,
+IMAGE_URL_PATTERN = re.compile(rb'"images"\s*:\s*\[.*?"url"\s*:\s*"data:[^,"]*,', re.DOTALL)
+
+# Requests currently in progress, by cache key, so concurrent callers with the
+# same prompt share a single API call.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+def _request_image(prompt: str, model_name: str, image_filepath: Path, role: str = "primary"):
+    """
+    Asks OpenRouter for an image and writes the decoded image to image_filepath.
+    role ("primary", "fallback" or "hedge") labels the request in metrics.
+    """
+    payload = {
+        "model": model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "modalities": ["image", "text"]
+    }
+
+    print(f"Sending request to OpenRouter for model: {model_name}...")
+    started = time.perf_counter()
+    with metrics.stage("openrouter_request", model=model_name, role=role):
+        response = get_client(OPENROUTER_API_KEY).chat_completions(payload, stream=True)
+        headers_received = time.perf_counter()
+
+        size = 0
+        try:
+            size = _stream_image_to_file(response, image_filepath)
+        finally:
+            # Round trip until the image was fully read, and the raw body size
+            metrics.record_http(response.url, response.status_code,
+                                response.elapsed.total_seconds() + time.perf_counter() - headers_received,
+                                len(response.request.body or b""), response.raw.tell())
+            metrics.record_bytes(written=size)
+            response.close()
+    LATENCY_HISTORY.record(model_name, time.perf_counter() - started)
+    print(f"Received {size:,} byte image from {model_name}.")
+
+def _stream_image_to_file(response, image_filepath: Path) -> int:
+    """
+    Finds choices[0].message.images[0].image_url.url in a streamed response
+    and base64-decodes the data URL straight into image_filepath.
+
+    Only one network chunk plus a scan window (the start of the images entry,
+    or a small tail before it) is held in memory, instead of the whole JSON
+    document, the base64 string and the decoded image.
+
+    Returns:
+        int: Number of image bytes written.
+    """
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    head = b""      # Start of the response, kept for error messages
+    window = b""    # Scan window for the data URL marker
+    match = None
+
+    for chunk in chunks:
+        if len(head) < ERROR_SNIPPET_SIZE:
+            head += chunk[:ERROR_SNIPPET_SIZE - len(head)]
+        window += chunk
+        match = IMAGE_URL_PATTERN.search(window)
+        if match:
+            break
+        images_at = window.find(b'"images"')
+        if images_at != -1:
+            # Keep everything from the images key until its data URL turns up,
+            # however far apart chunking puts them
+            window = window[images_at:]
+        else:
+            # Keep enough of the tail to match a key split across chunks
+            window = window[-SCAN_OVERLAP:]
+
+    if not match:
+        print("Could not find image data in the API response.")
+        print("API Response (start):", head.decode("utf-8", "replace"))
+        raise ValueError("No image data URL found in the OpenRouter response")
+
+    written = 0
+    pending = window[match.end():]
+    carry = b""     # Base64 characters not yet forming a full 4-char group
+    finished = False
+    with open(image_filepath, "wb") as f:
+        while True:
+            end = pending.find(b'"')
+            if end != -1:
+                pending = pending[:end]
+                finished = True
+
+            # A trailing backslash belongs to an escape completed by the next chunk
+            hold = b""
+            if not finished and pending.endswith(b"\\"):
+                pending, hold = pending[:-1], b"\\"
+            # JSON may escape "/" as "\/" and wrap lines with "\n"
+            data = carry + pending.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+            usable = len(data) if finished else len(data) - len(data) % 4
+            if usable:
+                decoded = base64.b64decode(data[:usable] + b"=" * (-usable % 4))
+                f.write(decoded)
+                written += len(decoded)
+            carry = data[usable:]
+
+            if finished:
+                break
+            try:
+                pending = hold + next(chunks)
+            except StopIteration:
+                raise ValueError("OpenRouter response ended inside the image data")
+
+    return written
+
+def _fetch_into_cache(key: str, prompt: str, model_name: str, role: str = "primary") -> Path:
+    """Requests a new image and stores it in the cache under key."""
+    COVER_ART_CACHE.directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=COVER_ART_CACHE.directory, prefix=".tmp_", suffix=".png")
+    os.close(fd)
+    try:
+        _request_image(prompt, model_name, Path(tmp_name), role)
+        return COVER_ART_CACHE.put(key, tmp_name, ".png")
+    finally:
+        Path(tmp_name).unlink(missing_ok=True)
+
+def _hedge_delay(model_name: str) -> float:
+    """Seconds to wait for model_name before hedging with the next model."""
+    seconds = LATENCY_HISTORY.percentile(model_name, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    return HEDGE_DEFAULT_SECONDS if seconds is None else seconds
+
+def _fetch_image(prompt: str, keys: dict) -> Path:
+    """
+    Requests an image from the models in keys ({model: cache key}), in
+    order, and returns the cached image of the first one to deliver.
+
+    A model that fails hands over to the next one. With HEDGE_PERCENTILE
+    set, a model that is slower than usual is joined by the next one and the
+    first image to arrive is used; the slower request finishes in the
+    background and is cached as well.
+    """
+    models = list(keys)
+    stages = metrics.current_stages()
+    running = {}    # Future -> model
+    last_error = None
+
+    def start(index: int, role: str) -> float:
+        """Starts the request to models[index] and returns when to hedge it."""
+        model = models[index]
+        future = Future()
+
+        def run():
+            metrics.inherit_stages(stages)
+            try:
+                future.set_result(_fetch_into_cache(keys[model], prompt, model, role))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"cover-art-{role}", daemon=True).start()
+        running[future] = model
+        return time.monotonic() + _hedge_delay(model) if HEDGE_PERCENTILE else None
+
+    hedge_at = start(0, "primary")
+    next_index = 1
+    while running:
+        hedging = hedge_at is not None and next_index < len(models)
+        done, _ = wait(running, timeout=max(0.0, hedge_at - time.monotonic()) if hedging else None,
+                       return_when=FIRST_COMPLETED)
+        if not done:
+            print(f"No image yet from {', '.join(running.values())}; also asking {models[next_index]}...")
+            hedge_at = start(next_index, "hedge")
+            next_index += 1
+            continue
+
+        for future in done:
+            model = running.pop(future)
+            try:
+                return future.result()
+            except Exception as e:
+                last_error = e
+                print(f"Cover art request to {model} failed: {e}")
+                if next_index < len(models):
+                    print(f"Falling back to {models[next_index]}...")
+                    hedge_at = start(next_index, "fallback")
+                    next_index += 1
+    raise last_error
+
+def _cached_image(keys: dict) -> Path:
+    """The cached image for the first of the models in keys that has one, or None."""
+    return next(filter(None, (COVER_ART_CACHE.get(key, ".png") for key in keys.values())), None)
+
+def _fetch_coalesced(key: str, prompt: str, keys: dict) -> Path:
+    """Like _fetch_image, but concurrent calls for the same key share one request."""
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _in_flight[key] = future
+
+    if not leader:
+        print("Waiting for an identical cover art request already in flight...")
+        return future.result()
+
+    try:
+        # A previous leader may have stored the image since our cache miss
+        future.set_result(_cached_image(keys) or _fetch_image(prompt, keys))
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+    return future.result()
+
+def _save_to_output(image_path: Path, output_dir: str) -> str:
+    """Copies an image into output_dir under a name derived from its content."""
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    # Content-addressed filename: identical images share a name, different
+    # images never overwrite each other
+    image_filepath = output_path / f"cover_art_{hash_file(str(image_path))[:16]}.png"
+    if not image_filepath.exists():
+        shutil.copyfile(image_path, image_filepath)
+    return str(image_filepath)
+
+def generate_cover_art(transcript: str, output_dir: str = "data", new_variant: bool = False,
+                       custom_prompt: bool = False) -> str:
     """
     Generates cover art using the OpenRouter API and saves it to a file.
 
+    The models in MODEL_NAMES are tried in order until one delivers an
+    image, hedging slow requests when HEDGE_PERCENTILE is set. Images are
+    cached by model and prompt, so an identical prompt returns the previous
+    image (from any of the models) without another API call unless
+    new_variant is set.
+
     Args:
         transcript (str): The audio transcript to base the cover art on.
         output_dir (str): The directory to save the image in. Defaults to "data".
+        new_variant (bool): Always request a fresh image, replacing the cached one.
+        custom_prompt (bool): transcript is the user's own prompt; use it verbatim.
 
     Returns:
         str: The path to the saved image file.
@@ -34,60 +309,22 @@ def generate_cover_art(transcript: str, output_dir: str = "data") -> str:
         raise ValueError("OPENROUTER_API_KEY not found in .env file")
 
     # Generate the image prompt using the prompt system
-    prompt = get_image_prompt(transcript)
+    prompt = get_image_prompt(transcript, custom_prompt)
     print(f"Generated image prompt: {prompt[:100]}...")
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    # Using the google/gemini-3-pro-image-preview model for image generation.
-    model_name = "google/gemini-3-pro-image-preview"
-
-    payload = {
-        "model": model_name,
-        "messages": [{"role": "user", "content": prompt}],
-        "modalities": ["image", "text"]
-    }
-
-    print(f"Sending request to OpenRouter for model: {model_name}...")
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        json=payload
-    )
-
-    if response.status_code != 200:
-        raise Exception(f"Error from OpenRouter API: {response.status_code} - {response.text}")
+    keys = {model: cache_key("cover-art-v1", model, prompt) for model in MODEL_NAMES}
+    cached = None if new_variant else _cached_image(keys)
+    if cached:
+        print("Using cached cover art for this prompt.")
+        image_path = cached
+    elif new_variant:
+        image_path = _fetch_image(prompt, keys)
+    else:
+        image_path = _fetch_coalesced(cache_key("cover-art-v1", *MODEL_NAMES, prompt), prompt, keys)
 
-    result = response.json()
-    
-    try:
-        image_data_url = result["choices"][0]["message"]["images"][0]["image_url"]["url"]
-        
-        # The data URL is in the format "data:image/png;base64,iVBORw0K..."
-        header, encoded = image_data_url.split(",", 1)
-        image_data = base64.b64decode(encoded)
-        
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        # Create a unique filename
-        timestamp = int(time.time())
-        image_filename = f"cover_art_{timestamp}.png"
-        image_filepath = output_path / image_filename
-
-        with open(image_filepath, "wb") as f:
-            f.write(image_data)
-        
-        print(f"Cover art successfully saved to: {image_filepath}")
-        return str(image_filepath)
-
-    except (KeyError, IndexError) as e:
-        print(f"Could not find image data in the API response: {e}")
-        print("Full API Response:", result)
-        raise
+    image_filepath = _save_to_output(image_path, output_dir)
+    print(f"Cover art successfully saved to: {image_filepath}")
+    return image_filepath
 
 if __name__ == '__main__':
     # Example usage
@@ -0,0 +1,182 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Stages whose outputs are checkpointed, in pipeline order
+CHECKPOINT_STAGES = ("transcript", "cover_art", "video")
+
+# Failed jobs are retried this many times, waiting RETRY_DELAY_SECONDS x attempt in between
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    audio_path TEXT NOT NULL UNIQUE,
+    output_path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    stage TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+class JobQueue:
+    """
+    SQLite-backed queue of video jobs with per-stage checkpoints.
+
+    A job moves queued → running → done, or back to queued after a failure
+    until MAX_ATTEMPTS is reached (then failed). Each finished stage records
+    its output file as an artifact, so a restarted job can pick up after the
+    last completed stage. One connection is opened per call, which keeps the
+    queue safe to use from several worker threads.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode: each statement commits unless a transaction is opened explicitly
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def enqueue(self, audio_path: str, output_path: str) -> bool:
+        """Adds a job for audio_path. Returns False if it was already queued or processed."""
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (audio_path, output_path, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(audio_path), str(output_path), now, now, now)
+            )
+            return cursor.rowcount > 0
+
+    def claim(self) -> dict:
+        """Marks the oldest available queued job as running and returns it, or None."""
+        now = time.time()
+        with self._connect() as db:
+            # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? "
+                    "ORDER BY id LIMIT 1", (now,)
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?", (now, row["id"])
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return dict(row, status="running", attempts=row["attempts"] + 1)
+
+    def checkpoint(self, job_id: int, stage: str, path: str):
+        """Records the output file of a finished stage."""
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts (job_id, stage, path, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, stage, str(path), time.time())
+            )
+
+    def artifacts(self, job_id: int) -> dict:
+        """Returns {stage: path} for the job's checkpoints whose files still exist."""
+        with self._connect() as db:
+            rows = db.execute("SELECT stage, path FROM artifacts WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["stage"]: row["path"] for row in rows if Path(row["path"]).exists()}
+
+    def complete(self, job_id: int):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'done', error = NULL, updated_at = ? WHERE id = ?",
+                       (time.time(), job_id))
+
+    def fail(self, job_id: int, error: str):
+        """Requeues the job with a delay, or marks it failed once it is out of attempts."""
+        now = time.time()
+        with self._connect() as db:
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            status = "failed" if attempts >= self.max_attempts else "queued"
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, now + RETRY_DELAY_SECONDS * attempts, now, job_id)
+            )
+
+    def recover(self) -> int:
+        """
+        Requeues jobs left running by a previous process that stopped or
+        crashed. Only call this when no other worker process uses the queue.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), "
+                "available_at = ?, updated_at = ? WHERE status = 'running'",
+                (now, now)
+            )
+            return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        """Gives every failed job a fresh set of attempts."""
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE status = 'failed'",
+                (now, now)
+            )
+            return cursor.rowcount
+
+    def jobs(self) -> list:
+        """All jobs as dicts, oldest first, with their checkpointed stages."""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+            stages = db.execute("SELECT job_id, stage FROM artifacts").fetchall()
+        done = {}
+        for row in stages:
+            done.setdefault(row["job_id"], set()).add(row["stage"])
+        return [dict(row, stages=[s for s in CHECKPOINT_STAGES if s in done.get(row["id"], ())])
+                for row in rows]
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the video job queue")
+    parser.add_argument("db", nargs="?", default="data/jobs.sqlite",
+                        help="Queue database (default: data/jobs.sqlite)")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue failed jobs")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.retry_failed:
+        print(f"Requeued {queue.retry_failed()} failed jobs")
+
+    print(f"{'ID':>4} {'Status':<8} {'Tries':>5}  {'Checkpoints':<28} Audio")
+    for job in queue.jobs():
+        print(f"{job['id']:>4} {job['status']:<8} {job['attempts']:>5}  "
+              f"{', '.join(job['stages']) or '-':<28} {Path(job['audio_path']).name}")
+        if job["status"] != "done" and job["error"]:
+            print(f"{'':>20}{job['error'][:100]}")
@@ -0,0 +1,83 @@
+import json
+import math
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Latencies kept per model; older ones are dropped first
+MAX_SAMPLES = 100
+
+class LatencyHistory:
+    """
+    Recent successful request latencies per model, kept in a JSON file so
+    percentiles carry over between runs and processes.
+
+    The file is re-read before every update, so parallel jobs add to the same
+    history instead of overwriting each other's samples (concurrent writes can
+    still drop a sample, which only costs a little precision).
+    """
+
+    def __init__(self, path: Path, max_samples: int = MAX_SAMPLES):
+        self.path = Path(path)
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, model: str, seconds: float):
+        """Adds a latency sample for model."""
+        with self._lock:
+            history = self._load()
+            samples = history.setdefault(model, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.max_samples]
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp_", suffix=".json")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(history, f)
+            os.replace(tmp_name, self.path)
+
+    def samples(self, model: str) -> list:
+        return list(self._load().get(model, []))
+
+    def percentile(self, model: str, percent: float, min_samples: int = 1) -> float:
+        """
+        The percent-th percentile (nearest rank) of model's recorded latencies,
+        or None with fewer than min_samples samples.
+        """
+        samples = sorted(self.samples(model))
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = max(1, math.ceil(percent / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+if __name__ == '__main__':
+    # Shows the recorded latency percentiles, to pick a hedge percentile
+    import argparse
+
+    try:
+        from cover_art import LATENCY_HISTORY
+    except ImportError:
+        from src.cover_art import LATENCY_HISTORY
+
+    parser = argparse.ArgumentParser(description="Show recorded image model latencies")
+    parser.add_argument("file", nargs="?", default=str(LATENCY_HISTORY.path),
+                        help="Latency history file (default: %(default)s)")
+    args = parser.parse_args()
+
+    history = LatencyHistory(args.file)
+    models = history._load()
+    if not models:
+        print(f"No latencies recorded in {args.file}")
+        raise SystemExit(0)
+    print(f"{'Model':<44}{'Count':>7}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}")
+    for model in sorted(models):
+        cells = "".join(f"{history.percentile(model, p):>8.1f}s" for p in (50, 90, 95, 99))
+        print(f"{model:<44}{len(models[model]):>7}{cells}")
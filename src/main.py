@@ -1,8 +1,10 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from transcribe import transcribe_audio
 from video import create_video
 from cover_art import generate_cover_art
+from prompt_loader import PROMPT_PREFIX_SECONDS
 
 def main():
     parser = argparse.ArgumentParser(
@@ -22,6 +24,10 @@ For more information: https://github.com/yourusername/notebooklm-to-youtube
         """
     )
     parser.add_argument("audio_file", type=str, help="Path to the input audio file (supports .mp3, .wav, .m4a, .mp4)")
+    parser.add_argument("--prefix-seconds", type=float, nargs="?", const=PROMPT_PREFIX_SECONDS,
+                        metavar="SECONDS",
+                        help="Prompt cover art from the first SECONDS of audio while the full "
+                             "transcription runs in the background")
     parser.add_argument("--version", action="version", version="NotebookLM to YouTube Converter v1.0.0")
     args = parser.parse_args()
 
@@ -30,10 +36,20 @@ For more information: https://github.com/yourusername/notebooklm-to-youtube
         print(f"Error: The file '{audio_path}' does not exist.")
         return
 
+    with ThreadPoolExecutor(max_workers=1) as background:
+        run(audio_path, args.prefix_seconds, background)
+
+def run(audio_path: Path, prefix_seconds: float, background: ThreadPoolExecutor):
     # --- 1. Transcription ---
     print("--- Step 1: Transcribing Audio ---")
+    full_transcription = None
     try:
-        transcript_path = transcribe_audio(str(audio_path))
+        if prefix_seconds:
+            transcript_path = transcribe_audio(str(audio_path), max_seconds=prefix_seconds)
+            full_transcription = background.submit(transcribe_audio, str(audio_path))
+            print("Full transcription continues in the background.")
+        else:
+            transcript_path = transcribe_audio(str(audio_path))
         with open(transcript_path, 'r') as f:
             transcript = f.read()
         print("Transcription successful.")
@@ -76,5 +92,12 @@ For more information: https://github.com/yourusername/notebooklm-to-youtube
     except Exception as e:
         print(f"An error occurred during video creation: {e}")
 
+    if full_transcription:
+        print("Waiting for the full transcription to finish...")
+        try:
+            print(f"Full transcript saved to: {full_transcription.result()}")
+        except Exception as e:
+            print(f"An error occurred during full transcription: {e}")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where stage, HTTP and cache records are appended as JSON lines. Off unless
+# set, since the file is never rotated and grows with every run.
+METRICS_FILE = os.getenv("NOTEBOOKLM_METRICS_FILE", "")
+
+# Identifies the records written by this process
+RUN_ID = uuid.uuid4().hex[:12]
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+class StageMetrics:
+    """Resource usage accumulated while a stage runs."""
+
+    def __init__(self, name: str, labels: dict, parent: "StageMetrics" = None):
+        self.name = name
+        self.labels = labels
+        self.parent = parent
+        self.child_processes = 0
+        self.child_cpu_seconds = 0.0
+        self.child_peak_rss_bytes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.http_requests = 0
+        self.http_seconds = 0.0
+        self.http_bytes_sent = 0
+        self.http_bytes_received = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def _active() -> list:
+    """The running stage in this thread and all stages enclosing it."""
+    return list(_stack())
+
+def current_stages() -> list:
+    """This thread's running stages, to hand to a worker thread with inherit_stages."""
+    return _active()
+
+def inherit_stages(stages: list):
+    """Makes stages the enclosing stages of this (worker) thread, so its usage counts towards them."""
+    _local.stack = list(stages)
+
+def emit(record: dict):
+    """Appends one record to METRICS_FILE and feeds the Prometheus registry."""
+    record = {"time": round(time.time(), 3), "run": RUN_ID, "pid": os.getpid(), **record}
+    REGISTRY.observe(record)
+    if not METRICS_FILE:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        path = Path(METRICS_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(line)
+
+@contextmanager
+def stage(name: str, **labels):
+    """
+    Measures a block of work as a stage: wall time, this thread's CPU time,
+    and everything recorded while it runs (child processes, bytes, HTTP
+    requests, cache lookups). Stages nest; the usage of an inner stage also
+    counts towards the stages around it. One record is emitted on exit, with
+    labels under its "labels" key.
+    """
+    stack = _stack()
+    metrics = StageMetrics(name, labels, stack[-1] if stack else None)
+    stack.append(metrics)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    status = "ok"
+    try:
+        yield metrics
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stack.pop()
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        emit({
+            "type": "stage",
+            "stage": name,
+            "parent": metrics.parent.name if metrics.parent else None,
+            "status": status,
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(cpu, 4),
+            "child_processes": metrics.child_processes,
+            "child_cpu_seconds": round(metrics.child_cpu_seconds, 4),
+            "child_peak_rss_bytes": metrics.child_peak_rss_bytes,
+            "bytes_read": metrics.bytes_read,
+            "bytes_written": metrics.bytes_written,
+            "http_requests": metrics.http_requests,
+            "http_seconds": round(metrics.http_seconds, 4),
+            "http_bytes_sent": metrics.http_bytes_sent,
+            "http_bytes_received": metrics.http_bytes_received,
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "labels": labels,
+        })
+
+def record_child(command: str, cpu_seconds: float, peak_rss_bytes: int,
+                 bytes_read: int, bytes_written: int, wall_seconds: float, returncode: int):
+    """Attributes a finished child process (ffmpeg, whisper) to the running stages."""
+    for metrics in _active():
+        metrics.child_processes += 1
+        metrics.child_cpu_seconds += cpu_seconds
+        metrics.child_peak_rss_bytes = max(metrics.child_peak_rss_bytes, peak_rss_bytes)
+        metrics.bytes_read += bytes_read
+        metrics.bytes_written += bytes_written
+    emit({
+        "type": "process",
+        "command": command,
+        "stage": _stack()[-1].name if _stack() else None,
+        "returncode": returncode,
+        "wall_seconds": round(wall_seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "peak_rss_bytes": peak_rss_bytes,
+        "bytes_read": bytes_read,
+        "bytes_written": bytes_written,
+    })
+
+def record_bytes(read: int = 0, written: int = 0):
+    """Adds file I/O done in this process to the running stages."""
+    for metrics in _active():
+        metrics.bytes_read += read
+        metrics.bytes_written += written
+
+def record_http(url: str, status: int, seconds: float, bytes_sent: int, bytes_received: int):
+    """Records one HTTP round trip (time until the full body was read)."""
+    for metrics in _active():
+        metrics.http_requests += 1
+        metrics.http_seconds += seconds
+        metrics.http_bytes_sent += bytes_sent
+        metrics.http_bytes_received += bytes_received
+    emit({
+        "type": "http",
+        "url": url,
+        "status": status,
+        "stage": _stack()[-1].name if _stack() else None,
+        "seconds": round(seconds, 4),
+        "bytes_sent": bytes_sent,
+        "bytes_received": bytes_received,
+    })
+
+def record_cache(cache: str, hit: bool):
+    """Records a cache lookup."""
+    for metrics in _active():
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+    emit({"type": "cache", "cache": cache, "hit": hit,
+          "stage": _stack()[-1].name if _stack() else None})
+
+def read_process_io(pid: int) -> tuple:
+    """(bytes read, bytes written) by a process so far, from /proc; zeros where unavailable."""
+    try:
+        with open(f"/proc/{pid}/io", "r") as f:
+            fields = dict(line.split(": ", 1) for line in f.read().splitlines() if ": " in line)
+        return int(fields.get("rchar", 0)), int(fields.get("wchar", 0))
+    except (OSError, ValueError):
+        return 0, 0
+
+class PrometheusRegistry:
+    """
+    Aggregates emitted records into counters for the Prometheus text format:
+    stage runs and seconds, child CPU and peak RSS, HTTP requests, cache hits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+
+    def _add(self, name: str, labels: tuple, value: float):
+        self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def observe(self, record: dict):
+        with self._lock:
+            kind = record["type"]
+            if kind == "stage":
+                labels = (("stage", record["stage"]), ("status", record["status"]))
+                self._add("notebooklm_stage_runs_total", labels, 1)
+                self._add("notebooklm_stage_seconds_total", labels, record["wall_seconds"])
+                self._add("notebooklm_stage_cpu_seconds_total", labels,
+                          record["cpu_seconds"] + record["child_cpu_seconds"])
+            elif kind == "process":
+                labels = (("command", record["command"]),)
+                self._add("notebooklm_child_processes_total", labels, 1)
+                self._add("notebooklm_child_cpu_seconds_total", labels, record["cpu_seconds"])
+                self._add("notebooklm_child_bytes_read_total", labels, record["bytes_read"])
+                self._add("notebooklm_child_bytes_written_total", labels, record["bytes_written"])
+                key = ("notebooklm_child_peak_rss_bytes", labels)
+                self.gauges[key] = max(self.gauges.get(key, 0), record["peak_rss_bytes"])
+            elif kind == "http":
+                labels = (("status", str(record["status"])),)
+                self._add("notebooklm_http_requests_total", labels, 1)
+                self._add("notebooklm_http_seconds_total", labels, record["seconds"])
+                self._add("notebooklm_http_bytes_received_total", labels, record["bytes_received"])
+            elif kind == "cache":
+                labels = (("cache", record["cache"]), ("result", "hit" if record["hit"] else "miss"))
+                self._add("notebooklm_cache_lookups_total", labels, 1)
+
+    def render(self) -> str:
+        """The current values in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in values}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (metric, labels), value in sorted(values.items()):
+                        if metric != name:
+                            continue
+                        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                        lines.append(f"{name}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = PrometheusRegistry()
+
+def start_prometheus_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves REGISTRY at http://host:port/metrics from a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    # Summarise a metrics file: time per stage, slowest first
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise recorded pipeline metrics")
+    parser.add_argument("file", nargs="?", default=METRICS_FILE or "data/metrics.jsonl",
+                        help="Metrics JSONL file (default: data/metrics.jsonl)")
+    parser.add_argument("--run", help="Only records from this run id")
+    args = parser.parse_args()
+
+    totals = {}
+    http = [0, 0.0]
+    cache = [0, 0]
+    with open(args.file, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            if args.run and record.get("run") != args.run:
+                continue
+            if record["type"] == "stage":
+                entry = totals.setdefault(record["stage"], [0, 0.0, 0.0, 0, 0])
+                entry[0] += 1
+                entry[1] += record["wall_seconds"]
+                entry[2] += record["cpu_seconds"] + record["child_cpu_seconds"]
+                entry[3] = max(entry[3], record["child_peak_rss_bytes"])
+                entry[4] += record["bytes_read"] + record["bytes_written"]
+            elif record["type"] == "http":
+                http[0] += 1
+                http[1] += record["seconds"]
+            elif record["type"] == "cache":
+                cache[0 if record["hit"] else 1] += 1
+
+    print(f"{'Stage':<20} {'Runs':>5} {'Wall':>9} {'CPU':>9} {'Peak RSS':>10} {'I/O':>10}")
+    for name, (runs, wall, cpu, rss, io) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"{name:<20} {runs:>5} {wall:8.1f}s {cpu:8.1f}s {rss / 2**20:8.1f}MB {io / 2**20:8.1f}MB")
+    if http[0]:
+        print(f"\nHTTP: {http[0]} requests, {http[1] / http[0]:.2f}s average")
+    if cache[0] or cache[1]:
+        print(f"Cache: {cache[0]} hits, {cache[1]} misses")
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+try:
+    import metrics
+except ImportError:
+    from src import metrics
+
+load_dotenv()
+
+# Point this at a local stub (see src/stub_openrouter.py) for offline testing.
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Image generation regularly takes a minute, so the read timeout is generous.
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "180"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "4"))
+MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "4"))
+
+# Responses worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+class OpenRouterError(Exception):
+    """Raised when OpenRouter answers with a non-200 status."""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"Error from OpenRouter API: {status_code} - {body}")
+        self.status_code = status_code
+        self.body = body
+
+class OpenRouterClient:
+    """
+    Connection-pooled OpenRouter client.
+
+    One requests.Session is reused for every call, so batch runs keep their
+    TLS connections alive. Calls have connect/read timeouts, are retried with
+    jittered exponential backoff on 429/5xx and connection errors, and at most
+    max_concurrency of them are in flight at once. Read timeouts are not
+    retried: the request may still be generating (and billing) an image.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 max_retries: int = MAX_RETRIES, max_concurrency: int = MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.base_url = (base_url or OPENROUTER_BASE_URL).rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _backoff(self, attempt: int, response: requests.Response = None) -> float:
+        """Seconds to wait before retry number attempt (full jitter, honours Retry-After)."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX_SECONDS)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def post(self, path: str, payload: dict, stream: bool = False) -> requests.Response:
+        """
+        POSTs payload as JSON to base_url + path, retrying transient failures.
+
+        Every attempt is recorded in metrics, except a successful streamed
+        response, whose body size is only known once the caller has read it.
+
+        Returns:
+            requests.Response: A 200 response. With stream=True the body has not
+                been read yet, and the response holds its concurrency slot until
+                the caller closes it.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            self._slots.acquire()
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except requests.ConnectionError as e:
+                # Includes connect timeouts, but not read timeouts
+                self._slots.release()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"OpenRouter request failed ({e.__class__.__name__}), retrying in {delay:.1f}s...")
+                response = None
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if response is not None:
+                if response.status_code == 200 and stream:
+                    self._release_on_close(response)
+                    return response
+                self._slots.release()
+                metrics.record_http(url, response.status_code, response.elapsed.total_seconds(),
+                                    len(response.request.body or b""), len(response.content))
+                if response.status_code == 200:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise OpenRouterError(response.status_code, response.text)
+                delay = self._backoff(attempt, response)
+                print(f"OpenRouter returned {response.status_code}, retrying in {delay:.1f}s...")
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _release_on_close(self, response: requests.Response):
+        """Frees the response's concurrency slot once it is closed, so the body download counts too."""
+        close = response.close
+        released = threading.Event()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    self._slots.release()
+
+        response.close = close_and_release
+
+    def chat_completions(self, payload: dict, stream: bool = False) -> requests.Response:
+        """POSTs to /chat/completions."""
+        return self.post("chat/completions", payload, stream=stream)
+
+    def close(self):
+        self.session.close()
+
+class AsyncOpenRouterClient:
+    """
+    asyncio front end for OpenRouterClient.
+
+    Calls run on the default executor, so they share the client's pooled
+    session, retries and backoff. An asyncio semaphore keeps coroutines from
+    queueing more executor work than the client's concurrency limit; the
+    client's own slots still bound what is in flight, including streamed
+    bodies that have not been closed yet.
+    """
+
+    def __init__(self, client: OpenRouterClient):
+        self.client = client
+        self._slots = asyncio.Semaphore(client.max_concurrency)
+
+    async def chat_completions(self, payload: dict, stream: bool = False) -> requests.Response:
+        """POSTs to /chat/completions without blocking the event loop."""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, lambda: self.client.chat_completions(payload, stream=stream))
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client(api_key: str) -> OpenRouterClient:
+    """Returns the process-wide client, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None or _default_client.api_key != api_key:
+            _default_client = OpenRouterClient(api_key)
+        return _default_client
@@ -0,0 +1,132 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import metrics
+except ImportError:
+    from src import metrics
+
+class StageSkipped(Exception):
+    """Raised by a stage to stop its dependents without treating it as an error."""
+
+class Pipeline:
+    """
+    Runs stages as a dependency graph, starting every stage as soon as the
+    stages it depends on have finished.
+
+    Stages run in a thread pool (they mostly wait on ffmpeg, whisper or HTTP),
+    except inline stages, which run on the calling thread so they can prompt
+    the user. Each stage function receives the dict of results so far.
+    Every stage is measured as a metrics stage of the same name.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+
+    def add(self, name: str, fn, deps=(), after=(), inline: bool = False):
+        """
+        Adds a stage.
+
+        Args:
+            name (str): Unique stage name; its return value is stored under it.
+            fn: Callable taking the results dict.
+            deps: Stages that must succeed first; if one fails, this stage is skipped.
+            after: Stages that must finish first, whether or not they succeed.
+            inline (bool): Run on the calling thread instead of the pool.
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        for dep in (*deps, *after):
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = {"fn": fn, "deps": tuple(deps), "after": tuple(after), "inline": inline}
+
+    def succeeded(self, name: str) -> bool:
+        return name in self.results
+
+    def _run_stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with metrics.stage(name):
+                self.results[name] = self.stages[name]["fn"](self.results)
+            status = "ok"
+        except StageSkipped as e:
+            self.errors[name] = e
+            status = "skipped"
+        except Exception as e:
+            self.errors[name] = e
+            status = "failed"
+        self.timings[name] = (start - self._start, time.perf_counter() - self._start, status)
+
+    def run(self) -> bool:
+        """
+        Runs all stages.
+
+        Returns:
+            bool: True if every stage succeeded.
+        """
+        self._start = time.perf_counter()
+        waiting = list(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while waiting or running:
+                progressed = False
+                for name in list(waiting):
+                    stage = self.stages[name]
+                    blockers = (*stage["deps"], *stage["after"])
+                    if any(dep not in self.timings for dep in blockers):
+                        continue
+                    waiting.remove(name)
+                    progressed = True
+
+                    failed = [dep for dep in stage["deps"] if dep not in self.results]
+                    if failed:
+                        now = time.perf_counter() - self._start
+                        self.errors[name] = StageSkipped(f"'{failed[0]}' did not complete")
+                        self.timings[name] = (now, now, "skipped")
+                    elif stage["inline"]:
+                        self._run_stage(name)
+                    else:
+                        running[pool.submit(self._run_stage, name)] = name
+
+                if progressed:
+                    continue
+                if not running:
+                    raise RuntimeError(f"Pipeline deadlocked waiting on: {', '.join(waiting)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    del running[future]
+
+        return not self.errors
+
+    def critical_path(self) -> list:
+        """Chain of stages that determined the total run time, first stage first."""
+        finished = {name: t for name, t in self.timings.items() if t[2] != "skipped"}
+        if not finished:
+            return []
+        name = max(finished, key=lambda n: finished[n][1])
+        path = [name]
+        while True:
+            stage = self.stages[name]
+            blockers = [d for d in (*stage["deps"], *stage["after"]) if d in finished]
+            if not blockers:
+                break
+            name = max(blockers, key=lambda n: finished[n][1])
+            path.append(name)
+        return path[::-1]
+
+    def report(self):
+        """Prints start and end time of every stage, marking the critical path."""
+        critical = set(self.critical_path())
+        width = max((len(name) for name in self.timings), default=0)
+        print("\n⏱️ Stage timeline (* = critical path)")
+        for name, (start, end, status) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            marker = "*" if name in critical else " "
+            note = "" if status == "ok" else f"  [{status}]"
+            print(f" {marker} {name:<{width}}  {start:7.2f}s → {end:7.2f}s  ({end - start:6.2f}s){note}")
@@ -0,0 +1,94 @@
+import json
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+# Audio codecs that can be stream-copied into an MP4 container and play back
+# everywhere we publish. Anything else (PCM, Opus, Vorbis, FLAC, ...) is transcoded.
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac"}
+
+@dataclass(frozen=True)
+class AudioInfo:
+    """Properties of the first audio stream of a media file, as reported by ffprobe."""
+    path: str
+    duration: float
+    codec: str
+    sample_rate: int
+    channels: int
+    bit_rate: int = None
+
+    @property
+    def mp4_compatible(self) -> bool:
+        """Whether the audio stream can be copied into an MP4 without re-encoding."""
+        return self.codec in MP4_AUDIO_CODECS
+
+    def is_whisper_ready(self) -> bool:
+        """Whether the file already is the 16 kHz mono s16 WAV that whisper.cpp expects."""
+        return (
+            self.codec == "pcm_s16le"
+            and self.sample_rate == 16000
+            and self.channels == 1
+            and Path(self.path).suffix.lower() == ".wav"
+        )
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def probe_audio(audio_path: str) -> AudioInfo:
+    """
+    Inspects an audio (or video) file with ffprobe.
+
+    Args:
+        audio_path (str): Path to the media file.
+
+    Returns:
+        AudioInfo: Duration, codec, sample rate and channel count of the first audio stream.
+    """
+    audio_p = Path(audio_path)
+    if not audio_p.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,sample_rate,channels,bit_rate,duration:format=duration",
+        "-of", "json",
+        str(audio_p)
+    ]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    data = json.loads(result.stdout or "{}")
+
+    streams = data.get("streams") or []
+    if not streams:
+        raise ValueError(f"No audio stream found in {audio_path}")
+    stream = streams[0]
+
+    # Stream duration is missing for some containers; the format duration is always there.
+    duration = stream.get("duration") or data.get("format", {}).get("duration")
+
+    return AudioInfo(
+        path=str(audio_p),
+        duration=float(duration) if duration else None,
+        codec=stream.get("codec_name"),
+        sample_rate=_to_int(stream.get("sample_rate")),
+        channels=_to_int(stream.get("channels")),
+        bit_rate=_to_int(stream.get("bit_rate")),
+    )
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Usage: python3 src/probe.py <audio_file>")
+        sys.exit(1)
+
+    info = probe_audio(sys.argv[1])
+    print(f"Duration:    {info.duration:.1f}s" if info.duration else "Duration:    unknown")
+    print(f"Codec:       {info.codec}")
+    print(f"Sample rate: {info.sample_rate} Hz")
+    print(f"Channels:    {info.channels}")
+    print(f"MP4 copy:    {'yes' if info.mp4_compatible else 'no (will transcode)'}")
@@ -0,0 +1,193 @@
+import os
+import re
+import subprocess
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import metrics
+except ImportError:
+    from src import metrics
+
+# Lines of ffmpeg/whisper output kept for error messages
+LOG_TAIL_LINES = 40
+
+# print_progress prints at most once every this many seconds per job
+PROGRESS_PRINT_INTERVAL = 5.0
+
+# whisper-cli segment lines: "[00:01:02.500 --> 00:01:07.000]  text"
+WHISPER_SEGMENT_PATTERN = re.compile(r"^\[([\d:.]+)\s+-->\s+([\d:.]+)\]")
+
+@dataclass
+class Progress:
+    """A progress update for one running ffmpeg or whisper process."""
+    label: str
+    seconds_done: float
+    elapsed: float
+    total_seconds: float = None
+    finished: bool = False
+
+    @property
+    def percent(self) -> float:
+        """Percent complete, or None when the total is unknown."""
+        if not self.total_seconds:
+            return None
+        return min(100.0, 100.0 * self.seconds_done / self.total_seconds)
+
+    @property
+    def speed(self) -> float:
+        """Media seconds processed per wall-clock second (x real time)."""
+        return self.seconds_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float:
+        """Estimated seconds until done, or None when it cannot be estimated yet."""
+        if not self.total_seconds or self.speed <= 0:
+            return None
+        return max(0.0, (self.total_seconds - self.seconds_done) / self.speed)
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def print_progress(interval: float = PROGRESS_PRINT_INTERVAL, name: str = None):
+    """
+    Returns a progress callback that prints one status line every interval
+    seconds, prefixed with name (e.g. the episode) when given.
+    """
+    last_printed = [0.0]
+
+    def callback(progress: Progress):
+        now = time.monotonic()
+        if not progress.finished and now - last_printed[0] < interval:
+            return
+        last_printed[0] = now
+        parts = [f"{_format_seconds(progress.seconds_done)}"]
+        if progress.percent is not None:
+            parts[0] = f"{progress.percent:5.1f}%"
+        parts.append(f"{progress.speed:.1f}x real time")
+        if progress.eta is not None and not progress.finished:
+            parts.append(f"ETA {_format_seconds(progress.eta)}")
+        prefix = f"[{name}] " if name else ""
+        print(f"⏳ {prefix}{progress.label}: {', '.join(parts)}")
+
+    return callback
+
+def parse_timestamp(value: str) -> float:
+    """Parses "HH:MM:SS.mmm", "MM:SS.mmm" or plain seconds."""
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def ffmpeg_progress_seconds(line: str) -> float:
+    """Media position from an ffmpeg -progress line, or None for other lines."""
+    # out_time_ms is also in microseconds, despite its name
+    if line.startswith(("out_time_us=", "out_time_ms=")):
+        value = line.split("=", 1)[1]
+        if value.strip().lstrip("-").isdigit():
+            return max(0.0, int(value) / 1_000_000)
+    return None
+
+def whisper_progress_seconds(line: str) -> float:
+    """End time of a whisper-cli segment line, or None for other lines."""
+    match = WHISPER_SEGMENT_PATTERN.match(line)
+    return parse_timestamp(match.group(2)) if match else None
+
+FFMPEG_PROGRESS_KEYS = {
+    "frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+    "dup_frames", "drop_frames", "speed", "progress",
+}
+
+def _is_ffmpeg_progress_line(line: str) -> bool:
+    key, sep, _ = line.partition("=")
+    return bool(sep) and (key in FFMPEG_PROGRESS_KEYS or key.startswith("stream_"))
+
+def _wait(process: subprocess.Popen) -> tuple:
+    """Reaps the process and returns (returncode, CPU seconds, peak RSS bytes)."""
+    if not hasattr(os, "wait4"):
+        return process.wait(), 0.0, 0
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux
+    return process.returncode, usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024
+
+def run_streaming(command: list, kind: str, label: str, total_seconds: float = None,
+                  on_progress=None, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                  tail_lines: int = LOG_TAIL_LINES, on_line=None) -> list:
+    """
+    Runs an ffmpeg or whisper-cli command, reading its output line by line
+    instead of buffering it, and reports progress as it goes.
+
+    For kind="ffmpeg", "-progress pipe:2 -nostats" is added and stderr is
+    parsed; stdout is left to the stdout argument so ffmpeg can still write
+    to a pipe. For kind="whisper", stdout and stderr are merged and segment
+    lines are parsed. Only the last tail_lines lines are kept in memory.
+
+    stdin defaults to /dev/null, so ffmpeg can never block on a prompt.
+    The process's CPU time, peak RSS and I/O are recorded in metrics.
+
+    Args:
+        command (list): The command to run.
+        kind (str): "ffmpeg" or "whisper".
+        label (str): Name of the job in progress updates.
+        total_seconds (float): Media duration, for percent and ETA (optional).
+        on_progress (callable): Called with a Progress on every update (optional).
+        stdin: stdin for the process. Defaults to subprocess.DEVNULL.
+        stdout: stdout for an ffmpeg process. Defaults to subprocess.DEVNULL.
+        tail_lines (int): Number of log lines to keep.
+        on_line (callable): Called with every output line that is not an ffmpeg
+            progress line, for callers that parse the log (optional).
+
+    Returns:
+        list: The last tail_lines lines of output (progress lines excluded).
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails; stderr holds the log tail.
+    """
+    if kind == "ffmpeg":
+        command = [command[0], "-progress", "pipe:2", "-nostats", *command[1:]]
+        process = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE,
+                                   text=True, errors="replace")
+        stream, parse = process.stderr, ffmpeg_progress_seconds
+    elif kind == "whisper":
+        process = subprocess.Popen(command, stdin=stdin, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True, errors="replace")
+        stream, parse = process.stdout, whisper_progress_seconds
+    else:
+        raise ValueError(f"Unknown process kind '{kind}', expected 'ffmpeg' or 'whisper'")
+
+    tail = deque(maxlen=tail_lines)
+    start = time.monotonic()
+    seconds_done = 0.0
+    try:
+        for line in stream:
+            line = line.rstrip()
+            seconds = parse(line)
+            if seconds is not None:
+                seconds_done = max(seconds_done, seconds)
+                if on_progress:
+                    on_progress(Progress(label, seconds_done, time.monotonic() - start, total_seconds))
+            if kind == "whisper" or not _is_ffmpeg_progress_line(line):
+                tail.append(line)
+                if on_line:
+                    on_line(line)
+        # Still readable while the exited process waits to be reaped
+        bytes_read, bytes_written = metrics.read_process_io(process.pid)
+        returncode, cpu_seconds, peak_rss = _wait(process)
+        metrics.record_child(Path(command[0]).name, cpu_seconds, peak_rss, bytes_read,
+                             bytes_written, time.monotonic() - start, returncode)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, stderr="\n".join(tail))
+    if on_progress:
+        on_progress(Progress(label, total_seconds or seconds_done, time.monotonic() - start,
+                             total_seconds, finished=True))
+    return list(tail)
@@ -1,5 +1,17 @@
 from pathlib import Path
 
+try:
+    from themes import extract_themes
+except ImportError:
+    from src.themes import extract_themes
+
+# Number of transcript characters that make it into the image prompt.
+PROMPT_THEME_CHARS = 400
+
+# Seconds of audio that reliably fill PROMPT_THEME_CHARS of transcript
+# (~65 words of conversation, with room for an intro jingle).
+PROMPT_PREFIX_SECONDS = 45
+
 def load_prompt(prompt_name: str) -> str:
     """
     Load a prompt from the prompts directory.
@@ -18,12 +30,13 @@ def load_prompt(prompt_name: str) -> str:
         print(f"Warning: Prompt file {prompt_path} not found. Using default.")
         return ""
 
-def get_image_prompt(transcript: str) -> str:
+def get_image_prompt(transcript: str, custom_prompt: bool = False) -> str:
     """
     Generate an image prompt based on the transcript using the configured prompts.
     
     Args:
-        transcript (str): The audio transcript
+        transcript (str): The audio transcript, or the user's own prompt text
+        custom_prompt (bool): transcript is a user-supplied prompt, used verbatim
         
     Returns:
         str: A complete prompt for image generation
@@ -31,8 +44,9 @@ def get_image_prompt(transcript: str) -> str:
     # Load the prompt components
     image_aesthetic = load_prompt("image_aesthetic")
     
-    # Analyze the transcript to extract key themes for artistic representation
-    key_themes = transcript[:400] if len(transcript) > 400 else transcript
+    # Distill the whole transcript into key themes for artistic representation;
+    # a user's own prompt is already the theme
+    key_themes = transcript.strip() if custom_prompt else extract_themes(transcript, PROMPT_THEME_CHARS)
     
     # Create a direct image generation prompt that combines the aesthetic with content themes
     full_prompt = f"""Create sophisticated podcast album art based on these themes from the audio content: "{key_themes}"
@@ -0,0 +1,149 @@
+import base64
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_png(width: int = 64, height: int = 64, rgb: tuple = (40, 60, 90)) -> bytes:
+    """Builds a solid-colour PNG without any imaging library."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    row = b"\0" + bytes(rgb) * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height))
+            + chunk(b"IEND", b""))
+
+class StubOpenRouter:
+    """
+    Local stand-in for OpenRouter's /api/v1/chat/completions image endpoint.
+
+    Answers with the same JSON shape as the real API, carrying a generated PNG
+    as a base64 data URL. Latency and failures can be injected:
+
+        delay: seconds to wait before answering (or a {model: seconds} dict)
+        failures: number of initial requests to fail with failure_status
+            (or a {model: count} dict)
+    """
+
+    def __init__(self, port: int = 0, delay=0.0, failures=0, failure_status: int = 503,
+                 image_size: int = 64):
+        self.delay = delay
+        self.failures = failures
+        self.failure_status = failure_status
+        self.image = make_png(image_size, image_size)
+        self.requests = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                stub._handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get("Content-Length", 0))
+        payload = json.loads(handler.rfile.read(length) or b"{}")
+        model = payload.get("model", "")
+
+        with self._lock:
+            self.requests.append({"model": model, "time": time.time()})
+            if isinstance(self.failures, dict):
+                fail = self.failures.get(model, 0) > 0
+                if fail:
+                    self.failures[model] -= 1
+            else:
+                fail = self.failures > 0
+                if fail:
+                    self.failures -= 1
+
+        delay = self.delay.get(model, 0.0) if isinstance(self.delay, dict) else self.delay
+        if delay:
+            time.sleep(delay)
+
+        if handler.path != "/api/v1/chat/completions":
+            status, body = 404, {"error": {"message": "Not found"}}
+        elif fail:
+            status, body = self.failure_status, {"error": {"message": "Injected failure"}}
+        else:
+            data_url = "data:image/png;base64," + base64.b64encode(self.image).decode("ascii")
+            status, body = 200, {
+                "id": f"gen-stub-{len(self.requests)}",
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {
+                        "role": "assistant",
+                        "content": "",
+                        "images": [{"type": "image_url", "image_url": {"url": data_url}}]
+                    }
+                }]
+            }
+
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def start(self) -> "StubOpenRouter":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stub of the OpenRouter image endpoint")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on (default: 8099)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--failures", type=int, default=0, help="Fail this many initial requests")
+    parser.add_argument("--failure-status", type=int, default=503, help="Status code for failures")
+    parser.add_argument("--model-delay", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="Delay for one model instead of --delay; unlisted models answer at once (repeatable)")
+    parser.add_argument("--model-failures", action="append", default=[], metavar="MODEL=COUNT",
+                        help="Fail this many initial requests for one model instead of --failures (repeatable)")
+    parser.add_argument("--image-size", type=int, default=64, help="Width/height of the returned PNG")
+    args = parser.parse_args()
+
+    delay, failures = args.delay, args.failures
+    if args.model_delay:
+        delay = {model: float(value) for model, value in (item.rsplit("=", 1) for item in args.model_delay)}
+    if args.model_failures:
+        failures = {model: int(value) for model, value in (item.rsplit("=", 1) for item in args.model_failures)}
+
+    stub = StubOpenRouter(args.port, delay, failures, args.failure_status, args.image_size)
+    print(f"Stub OpenRouter listening on {stub.base_url}")
+    print(f"Use it with: OPENROUTER_BASE_URL={stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
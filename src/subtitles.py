@@ -0,0 +1,163 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+
+try:
+    from process_runner import run_streaming
+except ImportError:
+    from src.process_runner import run_streaming
+
+# Language tag of the muxed subtitle track (the default whisper models are English-only)
+SUBTITLE_LANGUAGE = "eng"
+
+SRT_TIMESTAMP = re.compile(r"(\d+):(\d\d):(\d\d)[,.](\d{3})")
+
+def _parse_timestamp(value: str) -> float:
+    hours, minutes, seconds, millis = SRT_TIMESTAMP.match(value.strip()).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """Formats seconds as HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm with separator="." (WebVTT)."""
+    millis = int(round(max(0.0, seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    seconds, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+def parse_srt(path: str) -> list:
+    """Reads an SRT file into segments: dicts with "start", "end" (seconds) and "text"."""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        blocks = re.split(r"\n\s*\n", f.read().replace("\r\n", "\n").strip())
+    segments = []
+    for block in blocks:
+        lines = block.split("\n")
+        # The cue number is optional in practice; the timing line is not
+        timing = next((i for i, line in enumerate(lines) if "-->" in line), None)
+        if timing is None:
+            continue
+        start, end = lines[timing].split("-->")
+        segments.append({
+            "start": _parse_timestamp(start),
+            "end": _parse_timestamp(end.split()[0]),
+            "text": " ".join(line.strip() for line in lines[timing + 1:]).strip(),
+        })
+    return segments
+
+def write_srt(segments: list, path: str) -> str:
+    """Writes segments as SRT, skipping empty ones, and returns the path."""
+    cues = [s for s in segments if s["text"].strip()]
+    with open(path, 'w', encoding='utf-8') as f:
+        for number, segment in enumerate(cues, 1):
+            f.write(f"{number}\n{format_timestamp(segment['start'])} --> "
+                    f"{format_timestamp(segment['end'])}\n{segment['text'].strip()}\n\n")
+    return str(path)
+
+def write_vtt(segments: list, path: str) -> str:
+    """Writes segments as WebVTT, skipping empty ones, and returns the path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for segment in segments:
+            if segment["text"].strip():
+                f.write(f"{format_timestamp(segment['start'], '.')} --> "
+                        f"{format_timestamp(segment['end'], '.')}\n{segment['text'].strip()}\n\n")
+    return str(path)
+
+def mux_args(first_input: int, subtitles_path: str = None, chapters_path: str = None) -> tuple:
+    """
+    ffmpeg arguments that add a soft mov_text subtitle track and/or chapters
+    from an ffmetadata file to an MP4 being written, without touching the
+    audio and video streams. first_input is the index the first added input
+    will get.
+
+    Returns:
+        tuple: (input arguments, output arguments)
+    """
+    inputs, outputs = [], []
+    index = first_input
+    if subtitles_path:
+        inputs += ['-i', str(subtitles_path)]
+        outputs += ['-map', f'{index}:s:0', '-c:s', 'mov_text',
+                    '-metadata:s:s:0', f'language={SUBTITLE_LANGUAGE}']
+        index += 1
+    if chapters_path:
+        inputs += ['-f', 'ffmetadata', '-i', str(chapters_path)]
+        outputs += ['-map_chapters', str(index)]
+    return inputs, outputs
+
+def add_subtitles_and_chapters(video_path: str, subtitles_path: str = None,
+                               chapters_path: str = None, output_path: str = None) -> str:
+    """
+    Adds soft subtitles and/or chapters to an existing MP4 or M4A with a
+    stream-copy remux: nothing is re-encoded, so it takes seconds even for
+    long episodes. Subtitle tracks already in the file are replaced.
+
+    Args:
+        video_path (str): The existing video (or audio-only .m4a).
+        subtitles_path (str): SRT or WebVTT file to add as a mov_text track (optional).
+        chapters_path (str): ffmetadata file with [CHAPTER] sections (optional).
+        output_path (str): Where to write the result. Defaults to replacing video_path.
+
+    Returns:
+        str: The path of the remuxed file.
+    """
+    video_p = Path(video_path)
+    if not video_p.exists():
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+    output_p = Path(output_path) if output_path else video_p
+    temp_p = output_p.with_name(f".{output_p.stem}.remux{output_p.suffix}")
+
+    inputs, outputs = mux_args(1, subtitles_path, chapters_path)
+    command = [
+        'ffmpeg', '-y',
+        '-i', str(video_p),
+        *inputs,
+        '-map', '0',
+        '-map', '-0:s',        # Drop subtitle tracks from an earlier remux
+        '-c', 'copy',
+        *outputs,
+        str(temp_p)
+    ]
+    try:
+        run_streaming(command, "ffmpeg", "Adding subtitles and chapters")
+        os.replace(temp_p, output_p)
+    except subprocess.CalledProcessError as e:
+        print(f"Error adding subtitles and chapters: {e.stderr}")
+        raise
+    finally:
+        temp_p.unlink(missing_ok=True)
+    return str(output_p)
+
+if __name__ == '__main__':
+    # Adds subtitles and chapters to a finished video without re-encoding it
+    import argparse
+
+    try:
+        from chapters import detect_chapters, format_chapter_list, write_ffmetadata
+        from probe import probe_audio
+    except ImportError:
+        from src.chapters import detect_chapters, format_chapter_list, write_ffmetadata
+        from src.probe import probe_audio
+
+    parser = argparse.ArgumentParser(description="Mux soft subtitles and chapters into a video")
+    parser.add_argument("video", help="Existing MP4 video")
+    parser.add_argument("subtitles", help="SRT transcript from whisper (e.g. episode.srt)")
+    parser.add_argument("-o", "--output", help="Output file (default: replace the video)")
+    parser.add_argument("--no-subtitles", action="store_true", help="Only add chapters")
+    parser.add_argument("--no-chapters", action="store_true", help="Only add subtitles")
+    args = parser.parse_args()
+
+    chapters_path = None
+    if not args.no_chapters:
+        episode_chapters = detect_chapters(parse_srt(args.subtitles), probe_audio(args.video).duration)
+        if episode_chapters:
+            chapters_path = Path(args.video).with_suffix(".chapters.txt")
+            write_ffmetadata(episode_chapters, chapters_path)
+            print(format_chapter_list(episode_chapters))
+    try:
+        result = add_subtitles_and_chapters(args.video, None if args.no_subtitles else args.subtitles,
+                                            chapters_path, args.output)
+        print(f"Saved to {result}")
+    finally:
+        if chapters_path:
+            chapters_path.unlink(missing_ok=True)
@@ -1,78 +1,428 @@
 import os
+import shutil
 import subprocess
 from pathlib import Path
 import tempfile
+import threading
+from collections import deque
 
-def transcribe_audio(audio_file_path: str) -> str:
+try:
+    from probe import AudioInfo, probe_audio
+    from chunked_transcribe import transcribe_wav_chunked
+    from cache import FileCache, cache_key, hash_file
+    from whisper_config import WhisperConfig, select_whisper_config
+    from process_runner import LOG_TAIL_LINES, print_progress, run_streaming
+    import metrics
+    from whisper_server import (WhisperServerUnavailable, is_available, reserve_server, server_urls,
+                                transcribe_with_server)
+    from subtitles import parse_srt, write_srt, write_vtt
+except ImportError:
+    from src.probe import AudioInfo, probe_audio
+    from src.chunked_transcribe import transcribe_wav_chunked
+    from src.cache import FileCache, cache_key, hash_file
+    from src.whisper_config import WhisperConfig, select_whisper_config
+    from src.process_runner import LOG_TAIL_LINES, print_progress, run_streaming
+    from src import metrics
+    from src.whisper_server import (WhisperServerUnavailable, is_available, reserve_server, server_urls,
+                                    transcribe_with_server)
+    from src.subtitles import parse_srt, write_srt, write_vtt
+
+# How converted audio reaches whisper-cli: streamed through stdin, through a
+# tmpfs-backed temporary WAV, or through a regular temporary WAV on disk.
+INPUT_MODES = ("pipe", "memory", "file")
+
+# Transcripts keyed by audio content, model and whisper arguments, so re-runs
+# on the same episode (under any file name) skip whisper entirely.
+TRANSCRIPT_CACHE = FileCache(
+    "transcripts",
+    max_bytes=int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "200")) * 1024 * 1024)
+)
+
+# transcribe_audio calls running in this process, used to share out the
+# cores when the caller does not say how many jobs run concurrently.
+_active_jobs = 0
+_active_jobs_lock = threading.Lock()
+
+def build_conversion_command(audio_path: Path, wav_path: Path, audio_info: AudioInfo,
+                             mux_audio_path: Path = None, max_seconds: float = None) -> list:
+    """
+    Builds the ffmpeg command that converts the input to whisper's 16 kHz mono WAV.
+    wav_path may be "pipe:1" to stream the WAV to stdout.
+
+    When mux_audio_path is given, the same invocation also writes the audio
+    track for the final video, so the input is demuxed and decoded only once:
+    MP4-compatible audio is stream-copied, anything else goes through an
+    asplit graph and is encoded to AAC alongside the whisper PCM.
+
+    max_seconds stops decoding after that much audio.
+    """
+    command = ["ffmpeg", "-y"]
+    if max_seconds:
+        command += ["-t", str(max_seconds)]
+    command += ["-i", str(audio_path)]
+    if mux_audio_path is None:
+        return command + ["-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", "-f", "wav", str(wav_path)]
+
+    if audio_info.mp4_compatible:
+        return command + [
+            "-map", "0:a:0", "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", "-f", "wav", str(wav_path),
+            "-map", "0:a:0", "-c:a", "copy", "-vn", str(mux_audio_path),
+        ]
+
+    graph = (
+        "[0:a:0]asplit=2[asr][mux];"
+        "[asr]aresample=16000,aformat=sample_fmts=s16:channel_layouts=mono[whisper]"
+    )
+    return command + [
+        "-filter_complex", graph,
+        "-map", "[whisper]", "-c:a", "pcm_s16le", "-f", "wav", str(wav_path),
+        "-map", "[mux]", "-c:a", "aac", "-b:a", "192k", str(mux_audio_path),
+    ]
+
+class WhisperInputError(RuntimeError):
+    """Raised when whisper-cli fails to read audio streamed to its stdin."""
+
+def _memory_temp_dir() -> str:
+    """Returns a tmpfs-backed directory for temporary WAVs, or None for the system default."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return str(shm)
+    return None
+
+def _whisper_command(config: WhisperConfig, input_file: str, output_base: Path,
+                     subtitles: bool = False) -> list:
+    return [
+        str(config.executable),
+        "--model", str(config.model_path),
+        *config.cli_args(),
+        "--file", input_file,
+        "--output-txt",
+        *(["--output-srt"] if subtitles else []),
+        "--output-file", str(output_base)
+    ]
+
+def _transcribe_piped(audio_path: Path, audio_info: AudioInfo, mux_audio_path: Path,
+                      config: WhisperConfig, output_base: Path, max_seconds: float = None,
+                      total_seconds: float = None, on_progress=None, subtitles: bool = False):
+    """
+    Streams ffmpeg's WAV output straight into whisper-cli's stdin, so no
+    intermediate file is written to disk.
+    """
+    print(f"Streaming {audio_path} into whisper.cpp...")
+    if mux_audio_path:
+        print(f"Writing video audio track to {mux_audio_path} in the same pass...")
+
+    # Only the tail of ffmpeg's log is kept, for the error if the conversion fails
+    command = build_conversion_command(audio_path, "pipe:1", audio_info, mux_audio_path, max_seconds)
+    conversion = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    conversion_log = deque(maxlen=LOG_TAIL_LINES)
+    log_reader = threading.Thread(
+        target=lambda: conversion_log.extend(line.decode("utf-8", "replace").rstrip()
+                                             for line in conversion.stderr),
+        daemon=True
+    )
+    log_reader.start()
+    try:
+        run_streaming(_whisper_command(config, "-", output_base, subtitles), "whisper", "Transcribing",
+                      total_seconds, on_progress, stdin=conversion.stdout)
+        whisper_error = None
+    except subprocess.CalledProcessError as e:
+        whisper_error = e
+    finally:
+        # Let ffmpeg see a broken pipe if whisper exited early
+        conversion.stdout.close()
+    conversion_code = conversion.wait()
+    log_reader.join()
+    conversion.stderr.close()
+
+    # A whisper failure also breaks ffmpeg's pipe, so check whisper first
+    if whisper_error:
+        lines = whisper_error.stderr.strip().splitlines()
+        raise WhisperInputError(lines[-1] if lines else f"exit code {whisper_error.returncode}")
+    if conversion_code != 0:
+        stderr = "\n".join(conversion_log)
+        print(f"Error during audio conversion:\n{stderr}")
+        raise subprocess.CalledProcessError(conversion_code, command, stderr=stderr)
+
+def _write_mux_audio(audio_path: Path, mux_audio_path: Path, audio_info: AudioInfo):
+    """Writes the video audio track on its own, for when whisper does not run."""
+    codec = ["-c:a", "copy"] if audio_info.mp4_compatible else ["-c:a", "aac", "-b:a", "192k"]
+    run_streaming(
+        ["ffmpeg", "-y", "-i", str(audio_path), "-map", "0:a:0", "-vn", *codec, str(mux_audio_path)],
+        "ffmpeg", "Preparing audio", audio_info.duration, print_progress()
+    )
+
+def _transcript_cache_key(audio_path: Path, model_path: Path, whisper_args: list, servers: list = None) -> str:
+    if servers:
+        # Servers transcribe with whatever model they loaded, so their results
+        # are keyed by the servers rather than by the local model choice
+        return cache_key("transcript-v1", hash_file(str(audio_path)), "server", sorted(servers), whisper_args)
+    return cache_key("transcript-v1", hash_file(str(audio_path)),
+                     str(model_path), model_path.stat().st_size, whisper_args)
+
+def transcribe_audio(audio_file_path: str, audio_info: AudioInfo = None,
+                     mux_audio_path: str = None, input_mode: str = None,
+                     chunk_seconds: float = None, workers: int = None,
+                     max_seconds: float = None, use_cache: bool = True,
+                     model: str = None, threads: int = None, processors: int = None,
+                     concurrent_jobs: int = None, on_progress=None, subtitles: bool = False) -> str:
     """
     Transcribes the given audio file using the local whisper.cpp executable.
-    It first converts the audio to a WAV file format.
+    It first converts the audio to a WAV file format, unless the input already
+    is a 16 kHz mono WAV.
+
+    By default the converted audio is piped straight into whisper-cli without
+    touching the disk ("pipe"). If that fails, a tmpfs-backed WAV is used
+    ("memory"); "file" keeps the original on-disk temporary WAV.
+
+    With chunk_seconds, the audio is split at silences into chunks of roughly
+    that length which are transcribed by parallel whisper-cli processes.
+
+    If $WHISPER_SERVER_URL lists running whisper.cpp servers (comma-separated,
+    see src/whisper_server.py), single-pass transcription is sent to the least
+    busy one so the model stays loaded between episodes; the CLI is used when
+    they are down or fail.
+
+    With max_seconds, only the beginning of the episode is transcribed and the
+    result is written to <name>.prefix.txt instead of <name>.txt. That is
+    enough text to prompt cover art without waiting for the whole episode.
+
+    The model, thread and processor counts are picked from the audio
+    duration, the machine's cores and the number of concurrent jobs (see
+    src/whisper_config.py) unless given here or in the environment.
+
+    With subtitles, the segment timings are kept as well: <name>.srt and
+    <name>.vtt are written next to the transcript, for soft subtitles and
+    chapters (see src/subtitles.py and src/chapters.py).
+
+    Finished transcripts are cached by audio content, model and arguments;
+    a cache hit is copied to the output path without running whisper.
 
     Args:
         audio_file_path (str): The path to the audio file.
+        audio_info (AudioInfo): Probe results for the audio file; probed here when omitted.
+        mux_audio_path (str): Also write an MP4-ready audio track here from the same decode (optional).
+        input_mode (str): "pipe", "memory" or "file". Defaults to $WHISPER_INPUT_MODE or "pipe".
+        chunk_seconds (float): Enable chunked parallel transcription with this chunk length (optional).
+        workers (int): Number of parallel whisper processes in chunked mode (optional).
+        max_seconds (float): Only transcribe the first max_seconds of audio (optional).
+        use_cache (bool): Consult and fill the transcript cache. Defaults to True.
+        model (str): Whisper model name ("base.en") or path (optional).
+        threads (int): Threads per whisper processor (optional).
+        processors (int): whisper-cli processors splitting the audio (optional).
+        concurrent_jobs (int): Whisper jobs sharing the machine. Defaults to those running in this process.
+        on_progress (callable): Receives process_runner.Progress updates from ffmpeg and
+            whisper. Defaults to printing a status line every few seconds.
+        subtitles (bool): Also write timed .srt and .vtt files. Defaults to False.
 
     Returns:
         str: The path to the generated transcript file.
     """
+    global _active_jobs
+    with _active_jobs_lock:
+        _active_jobs += 1
+        running_jobs = _active_jobs
+    try:
+        with metrics.stage("transcribe", audio=Path(audio_file_path).name, prefix=bool(max_seconds)):
+            return _transcribe_audio(audio_file_path, audio_info, mux_audio_path, input_mode,
+                                     chunk_seconds, workers, max_seconds, use_cache, model,
+                                     threads, processors, concurrent_jobs or running_jobs,
+                                     on_progress or print_progress(), subtitles)
+    finally:
+        with _active_jobs_lock:
+            _active_jobs -= 1
+
+def _finish_subtitles(subtitles_path: Path, key: str = None, segments: list = None):
+    """Writes the WebVTT copy of a finished SRT (from segments when given) and caches the SRT."""
+    if segments is not None:
+        write_srt(segments, subtitles_path)
+    write_vtt(parse_srt(subtitles_path), subtitles_path.with_suffix(".vtt"))
+    if key:
+        TRANSCRIPT_CACHE.put(key, str(subtitles_path), ".srt")
+    print(f"Subtitles saved to {subtitles_path} and {subtitles_path.with_suffix('.vtt')}")
+
+def _transcribe_audio(audio_file_path, audio_info, mux_audio_path, input_mode, chunk_seconds,
+                      workers, max_seconds, use_cache, model, threads, processors,
+                      concurrent_jobs, on_progress, subtitles) -> str:
     audio_path = Path(audio_file_path).resolve()
-    whisper_dir = Path.home() / "LLM-apps" / "whisper.cpp"
-    whisper_executable = whisper_dir / "build" / "bin" / "whisper-cli"
-    model_path = whisper_dir / "models" / "ggml-tiny.en.bin"
 
-    if not whisper_executable.exists():
-        raise FileNotFoundError(f"Whisper executable not found at {whisper_executable}")
-    if not model_path.exists():
-        raise FileNotFoundError(f"Whisper model not found at {model_path}")
+    if max_seconds:
+        output_file_path = audio_path.with_suffix(".prefix.txt")
+    else:
+        output_file_path = audio_path.with_suffix(".txt")
+    subtitles_path = output_file_path.with_suffix(".srt") if subtitles else None
+    input_mode = input_mode or os.getenv("WHISPER_INPUT_MODE", "pipe")
 
-    output_file_path = audio_path.with_suffix(".txt")
+    if audio_info is None:
+        audio_info = probe_audio(str(audio_path))
+    if audio_info.duration:
+        print(f"Audio: {audio_info.codec}, {audio_info.sample_rate} Hz, "
+              f"{audio_info.channels} ch, {audio_info.duration:.1f}s")
 
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav_file:
-        wav_path = Path(tmp_wav_file.name)
+    duration = audio_info.duration
+    if duration and max_seconds:
+        duration = min(duration, max_seconds)
+    config = select_whisper_config(duration, concurrent_jobs, model=model, threads=threads,
+                                   processors=processors)
+    if not config.executable.exists():
+        raise FileNotFoundError(f"Whisper executable not found at {config.executable}")
+    if not config.model_path.exists():
+        raise FileNotFoundError(f"Whisper model not found at {config.model_path}")
+    print(f"Whisper: {config.describe()}")
 
-    # Convert audio to WAV format using ffmpeg
-    print(f"Converting {audio_path} to WAV format...")
-    try:
-        subprocess.run(
-            ["ffmpeg", "-i", str(audio_path), "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", str(wav_path), "-y"],
-            check=True
-        )
-        print("Audio conversion completed.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error during audio conversion: {e}")
-        os.remove(wav_path)
-        raise
+    if max_seconds:
+        # A prefix is short: no point in chunking it or muxing a partial track
+        print(f"Transcribing only the first {max_seconds:g}s of audio.")
+        chunk_seconds = None
+        mux_audio_path = None
+    if mux_audio_path:
+        mux_audio_path = Path(mux_audio_path)
+    converted = (mux_audio_path is not None or max_seconds is not None
+                 or not audio_info.is_whisper_ready())
+    if not converted:
+        print("Audio is already 16 kHz mono WAV, skipping conversion.")
+        input_mode = "file"
 
-    command = [
-        str(whisper_executable),
-        "--model", str(model_path),
-        "--file", str(wav_path),
-        "--output-txt",
-        "--output-file", str(output_file_path.with_suffix(''))
-    ]
+    if input_mode not in INPUT_MODES:
+        raise ValueError(f"Unknown input mode '{input_mode}', expected one of {INPUT_MODES}")
+
+    if chunk_seconds and not audio_info.duration:
+        print("Audio duration unknown, falling back to single-pass transcription.")
+        chunk_seconds = None
+    servers = [] if chunk_seconds else server_urls()
+    if servers:
+        servers = [url for url in servers if is_available(url)]
+        if not servers:
+            print(f"No whisper server at {os.getenv('WHISPER_SERVER_URL')}, using whisper-cli.")
+    if (chunk_seconds or servers) and input_mode == "pipe":
+        # Chunks are cut from, and server uploads read, the converted WAV, so
+        # it has to exist somewhere
+        input_mode = "memory"
+
+    output_base = output_file_path.with_suffix('')
+
+    key = None
+    if use_cache:
+        # Thread counts don't change the output, but splitting into processors does
+        whisper_args = ["--output-txt", f"max_seconds={max_seconds}", f"chunk_seconds={chunk_seconds}",
+                        f"processors={None if chunk_seconds else config.processors}"]
+        key = _transcript_cache_key(audio_path, config.model_path, whisper_args, servers)
+        cached = TRANSCRIPT_CACHE.get(key, ".txt")
+        # The timings are cached next to the text; without them it is a miss
+        cached_subtitles = TRANSCRIPT_CACHE.get(key, ".srt") if cached and subtitles else None
+        if cached and (cached_subtitles or not subtitles):
+            shutil.copyfile(cached, output_file_path)
+            print(f"Using cached transcript. Output saved to {output_file_path}")
+            if subtitles_path:
+                shutil.copyfile(cached_subtitles, subtitles_path)
+                _finish_subtitles(subtitles_path)
+            if mux_audio_path:
+                _write_mux_audio(audio_path, mux_audio_path, audio_info)
+            return str(output_file_path)
+
+    if converted and input_mode == "pipe":
+        try:
+            with metrics.stage("whisper", input="pipe", model=config.model_name):
+                _transcribe_piped(audio_path, audio_info, mux_audio_path, config,
+                                  output_base, max_seconds, duration, on_progress, subtitles)
+            print(f"Transcription complete. Output saved to {output_file_path}")
+            if key:
+                TRANSCRIPT_CACHE.put(key, str(output_file_path), ".txt")
+            if subtitles_path:
+                _finish_subtitles(subtitles_path, key)
+            return str(output_file_path)
+        except WhisperInputError as e:
+            # Older whisper-cli builds cannot read WAV from stdin
+            print(f"Streaming into whisper failed ({e}), retrying with a memory-backed WAV...")
+            input_mode = "memory"
+
+    if converted:
+        temp_dir = _memory_temp_dir() if input_mode == "memory" else None
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=temp_dir) as tmp_wav_file:
+            wav_path = Path(tmp_wav_file.name)
+
+        # Convert audio to WAV format using ffmpeg
+        print(f"Converting {audio_path} to WAV format...")
+        if mux_audio_path:
+            print(f"Writing video audio track to {mux_audio_path} in the same pass...")
+        try:
+            with metrics.stage("wav_conversion", input=input_mode):
+                run_streaming(
+                    build_conversion_command(audio_path, wav_path, audio_info, mux_audio_path, max_seconds),
+                    "ffmpeg", "Converting audio", duration, on_progress
+                )
+            print("Audio conversion completed.")
+        except subprocess.CalledProcessError as e:
+            print(f"Error during audio conversion: {e}\n{e.stderr}")
+            os.remove(wav_path)
+            raise
+    else:
+        wav_path = audio_path
+
+    command = _whisper_command(config, str(wav_path), output_base, subtitles)
+    segments = None
 
     print("Starting transcription...")
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print(f"Transcription complete. Output saved to {output_file_path}")
-        print("Whisper.cpp output:\n", result.stdout)
+        backend = "server" if servers else "chunked" if chunk_seconds else "cli"
+        with metrics.stage("whisper", input=input_mode, backend=backend, model=config.model_name):
+            if servers:
+                try:
+                    with reserve_server(servers) as server:
+                        transcribe_with_server(str(wav_path), str(output_file_path), server,
+                                               subtitles_path=subtitles_path)
+                    print(f"Transcription complete (whisper server). Output saved to {output_file_path}")
+                except WhisperServerUnavailable as e:
+                    print(f"{e}, falling back to whisper-cli...")
+                    servers = []
+                    if key:
+                        key = _transcript_cache_key(audio_path, config.model_path, whisper_args)
+            if chunk_seconds:
+                segments = transcribe_wav_chunked(str(wav_path), audio_info.duration, config.executable,
+                                                  config.model_path, str(output_file_path), chunk_seconds,
+                                                  workers, temp_dir=_memory_temp_dir(),
+                                                  cores=config.threads * config.processors,
+                                                  on_progress=on_progress)
+                print(f"Transcription complete. Output saved to {output_file_path}")
+            elif not servers:
+                run_streaming(command, "whisper", "Transcribing", duration, on_progress)
+                print(f"Transcription complete. Output saved to {output_file_path}")
     except subprocess.CalledProcessError as e:
         print(f"Error during transcription: {e.stderr}")
         raise
     finally:
         # Clean up the temporary WAV file
-        os.remove(wav_path)
+        if converted:
+            os.remove(wav_path)
 
+    if key:
+        TRANSCRIPT_CACHE.put(key, str(output_file_path), ".txt")
+    if subtitles_path:
+        _finish_subtitles(subtitles_path, key, segments)
     return str(output_file_path)
 
 if __name__ == '__main__':
     # This is an example of how to use the function.
-    audio_file_to_process = "data/Beyond_the_Hype__Debunking_the_AI_Bubble_and_Unpacking_Its_True_Impact (1).m4a"
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcribe an audio file with whisper.cpp")
+    parser.add_argument("audio_file", help="Audio file to transcribe")
+    parser.add_argument("--model", help="Whisper model name (e.g. base.en) or path")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached transcripts")
+    parser.add_argument("--subtitles", action="store_true", help="Also write .srt and .vtt subtitles")
+    args = parser.parse_args()
 
-    if not os.path.exists(audio_file_to_process):
-        print(f"Error: The file '{audio_file_to_process}' does not exist.")
+    if not os.path.exists(args.audio_file):
+        print(f"Error: The file '{args.audio_file}' does not exist.")
     else:
         try:
-            transcript_path = transcribe_audio(audio_file_to_process)
+            transcript_path = transcribe_audio(args.audio_file, model=args.model,
+                                               use_cache=not args.no_cache, subtitles=args.subtitles)
             with open(transcript_path, 'r') as f:
                 print("\n--- Transcript ---")
                 print(f.read())
@@ -1,14 +1,220 @@
+import shutil
 import subprocess
+import tempfile
 from pathlib import Path
 
-def create_video(image_path: str, audio_path: str, output_path: str):
+try:
+    from probe import AudioInfo, probe_audio
+    from process_runner import print_progress, run_streaming
+    from subtitles import add_subtitles_and_chapters, mux_args
+    import metrics
+except ImportError:
+    from src.probe import AudioInfo, probe_audio
+    from src.process_runner import print_progress, run_streaming
+    from src.subtitles import add_subtitles_and_chapters, mux_args
+    from src import metrics
+
+# The cover art never changes, so there is no point in encoding 25 identical
+# frames per second. One frame per second with a long GOP keeps the picture
+# identical while cutting the number of encoded frames by 25x.
+STILL_IMAGE_FPS = 1
+STILL_IMAGE_GOP = 30           # One keyframe every 30 seconds at STILL_IMAGE_FPS
+STILL_IMAGE_PRESET = "veryfast"
+
+# Rendition names and their video height; None is an audio-only .m4a.
+RENDITIONS = {
+    "1080p": 1080,
+    "720p": 720,
+    "480p": 480,
+    "audio": None,
+}
+
+def _still_image_video_args() -> list:
+    """ffmpeg output options for encoding a looped still image."""
+    return [
+        '-c:v', 'libx264',
+        '-tune', 'stillimage',               # Tuned for static content
+        '-preset', STILL_IMAGE_PRESET,
+        '-r', str(STILL_IMAGE_FPS),
+        '-g', str(STILL_IMAGE_GOP),          # Long GOP, mostly tiny P-frames
+    ]
+
+def _audio_codec_args(audio_info: AudioInfo) -> list:
+    """Stream-copies MP4-compatible audio and transcodes everything else to AAC."""
+    if audio_info.mp4_compatible:
+        return ['-c:a', 'copy']
+    return ['-c:a', 'aac', '-b:a', '192k']
+
+def _encode_loop_segment(image_p: Path, segment_p: Path, seconds: float, height: int = None):
+    """
+    Encodes a short video-only segment of the still image that can later be
+    repeated with stream copy, optionally scaled to height.
+    """
+    command = [
+        'ffmpeg', '-y',
+        '-loop', '1',
+        '-framerate', str(STILL_IMAGE_FPS),
+        '-i', str(image_p),
+        '-t', str(seconds),
+        *(['-vf', f'scale=-2:{height}'] if height else []),
+        *_still_image_video_args(),
+        '-an',
+        str(segment_p)
+    ]
+    run_streaming(command, "ffmpeg", "Encoding segment", seconds)
+
+def rendition_paths(output_path: str, renditions: list) -> dict:
+    """
+    Maps rendition names to output files next to output_path:
+    episode.mp4 becomes episode_1080p.mp4, episode_720p.mp4, episode_audio.m4a.
+    """
+    output_p = Path(output_path)
+    paths = {}
+    for name in renditions:
+        if name not in RENDITIONS:
+            raise ValueError(f"Unknown rendition '{name}', expected one of {', '.join(RENDITIONS)}")
+        suffix = output_p.suffix if RENDITIONS[name] else ".m4a"
+        paths[name] = output_p.with_name(f"{output_p.stem}_{name}{suffix}")
+    return paths
+
+def _tee_output(outputs: dict) -> str:
+    """
+    Builds the tee muxer target that writes every rendition from the same
+    encoded streams: each video output gets its own scaled video stream, and
+    all of them share the single audio stream.
+    """
+    slaves = []
+    video_index = 0
+    for name, path in outputs.items():
+        if RENDITIONS[name]:
+            select = f"v:{video_index},a"
+            video_index += 1
+        else:
+            select = "a"
+        # The quotes around select are escaped because tee unquotes the slave
+        # list once before parsing each slave's options
+        escaped = str(path).replace("\\", "\\\\").replace("|", "\\|")
+        slaves.append(f"[f=mp4:movflags=+faststart:select=\\'{select}\\']{escaped}")
+    return "|".join(slaves)
+
+def _create_renditions(image_p: Path, audio_p: Path, outputs: dict, audio_info: AudioInfo,
+                       loop_segment_seconds: float = None, on_progress=None,
+                       subtitles_path: str = None, chapters_path: str = None) -> dict:
+    """
+    Writes every rendition in one ffmpeg run: the image is decoded once and
+    split/scaled per video rendition, the audio is encoded (or copied) once,
+    and the tee muxer hands the streams to each output file. Subtitles and
+    chapters are then added to each file with a stream-copy remux.
+    """
+    heights = [RENDITIONS[name] for name in outputs if RENDITIONS[name]]
+    duration = audio_info.duration
+
+    segment_dir = None
+    filter_args = []
+    if heights and loop_segment_seconds:
+        segment_dir = Path(tempfile.mkdtemp(prefix="still_segment_"))
+        segments = [segment_dir / f"segment_{height}.mp4" for height in heights]
+        video_input = []
+        for segment_p in segments:
+            video_input += ['-stream_loop', '-1', '-i', str(segment_p)]
+        video_maps = [arg for i in range(len(heights)) for arg in ('-map', f'{i}:v:0')]
+        video_codec = ['-c:v', 'copy']
+    elif heights:
+        video_input = ['-loop', '1', '-framerate', str(STILL_IMAGE_FPS), '-i', str(image_p)]
+        labels = [f"v{i}" for i in range(len(heights))]
+        graph = f"[0:v]split={len(heights)}{''.join(f'[s{i}]' for i in range(len(heights)))};"
+        graph += ";".join(f"[s{i}]scale=-2:{height}[{label}]"
+                          for i, (height, label) in enumerate(zip(heights, labels)))
+        filter_args = ['-filter_complex', graph]
+        video_maps = [arg for label in labels for arg in ('-map', f'[{label}]')]
+        video_codec = _still_image_video_args()
+    else:
+        video_input, video_maps, video_codec = [], [], []
+
+    audio_index = len(heights) if loop_segment_seconds else min(len(heights), 1)
+    command = [
+        'ffmpeg', '-y',
+        *video_input,
+        '-i', str(audio_p),
+        *filter_args,
+        *video_maps,
+        '-map', f'{audio_index}:a:0',
+        *video_codec,
+        *_audio_codec_args(audio_info),
+        *(['-shortest'] if heights else []),
+        *(['-t', f"{duration:.3f}"] if duration else []),
+        '-flags', '+global_header',     # Required by the MP4 outputs behind tee
+        '-f', 'tee', _tee_output(outputs)
+    ]
+
+    print(f"Creating {len(outputs)} renditions in one pass: {', '.join(outputs)}")
+    try:
+        if segment_dir:
+            print(f"Encoding {loop_segment_seconds}s still-image segments...")
+            with metrics.stage("loop_segment", renditions=len(heights)):
+                for segment_p, height in zip(segments, heights):
+                    _encode_loop_segment(image_p, segment_p, loop_segment_seconds, height)
+        with metrics.stage("ffmpeg_encode", renditions=",".join(outputs)):
+            log_tail = run_streaming(command, "ffmpeg", "Encoding renditions", duration, on_progress)
+        # tee carries on when a slave cannot be opened, so check every output
+        missing = [str(path) for path in outputs.values() if not Path(path).exists()]
+        if missing:
+            raise RuntimeError(f"ffmpeg did not write {', '.join(missing)}: " + "\n".join(log_tail[-5:]))
+        if subtitles_path or chapters_path:
+            for name, path in outputs.items():
+                # Subtitles only go into the videos; the audio-only file gets chapters
+                subtitles = subtitles_path if RENDITIONS[name] else None
+                if subtitles or chapters_path:
+                    add_subtitles_and_chapters(path, subtitles, chapters_path)
+        print("Renditions created successfully.")
+    except subprocess.CalledProcessError as e:
+        print(f"Error creating renditions: {e.stderr}")
+        raise
+    finally:
+        if segment_dir:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+    return outputs
+
+def create_video(image_path: str, audio_path: str, output_path: str,
+                 loop_segment_seconds: float = None, audio_info: AudioInfo = None,
+                 renditions: list = None, on_progress=None, subtitles_path: str = None,
+                 chapters_path: str = None):
     """
     Creates a video from a single image and an audio file using ffmpeg.
 
+    The image is encoded in still-image mode (low frame rate, stillimage tuning,
+    long GOP). When loop_segment_seconds is given, a segment of that length is
+    encoded once and then repeated with stream copy up to the audio duration, so
+    encoding time no longer depends on the episode length.
+
+    ffmpeg's progress is reported to on_progress (a callable taking a
+    process_runner.Progress); by default a status line is printed every few
+    seconds. Only a short tail of ffmpeg's log is kept, for error messages.
+
+    Audio that can live in an MP4 as-is (e.g. AAC from NotebookLM .m4a files)
+    is stream-copied; other codecs are transcoded to AAC.
+
+    With renditions (names from RENDITIONS, e.g. ["1080p", "720p", "audio"]),
+    every rendition is written by a single ffmpeg run next to output_path
+    (see rendition_paths) instead of output_path itself.
+
+    subtitles_path (SRT/WebVTT) is muxed as a soft mov_text track and
+    chapters_path (ffmetadata) as MP4 chapters, in the same ffmpeg run;
+    nothing is burned into the picture.
+
     Args:
         image_path (str): Path to the input image.
         audio_path (str): Path to the input audio.
         output_path (str): Path to the output video file.
+        loop_segment_seconds (float): Length of the pre-encoded segment to loop (optional).
+        audio_info (AudioInfo): Probe results for audio_path; probed here when omitted.
+        renditions (list): Rendition names to write in one pass (optional).
+        on_progress (callable): Receives encoding progress updates (optional).
+        subtitles_path (str): Subtitles to add as a soft track (optional).
+        chapters_path (str): ffmetadata file with chapters (optional).
+
+    Returns:
+        dict: Rendition names mapped to output paths when renditions are given, else None.
     """
     image_p = Path(image_path)
     audio_p = Path(audio_path)
@@ -19,49 +225,102 @@ def create_video(image_path: str, audio_path: str, output_path: str):
     if not audio_p.exists():
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
+    if audio_info is None:
+        audio_info = probe_audio(str(audio_p))
+
+    # -shortest overshoots badly with a 1 fps video stream (and is ignored for a
+    # stream-copied loop), so cut the output at the exact audio duration instead.
+    duration = audio_info.duration
+    if loop_segment_seconds and duration is None:
+        print("Could not determine audio duration, encoding without segment loop.")
+        loop_segment_seconds = None
+    on_progress = on_progress or print_progress()
+
+    if renditions:
+        return _create_renditions(image_p, audio_p, rendition_paths(output_p, renditions),
+                                  audio_info, loop_segment_seconds, on_progress,
+                                  subtitles_path, chapters_path)
+
+    segment_dir = None
+    if loop_segment_seconds:
+        segment_dir = Path(tempfile.mkdtemp(prefix="still_segment_"))
+        segment_p = segment_dir / "segment.mp4"
+        video_input = [
+            '-stream_loop', '-1',  # Repeat the pre-encoded segment indefinitely
+            '-i', str(segment_p),
+        ]
+        video_codec = ['-c:v', 'copy']
+    else:
+        video_input = [
+            '-loop', '1',                          # Loop the image
+            '-framerate', str(STILL_IMAGE_FPS),
+            '-i', str(image_p),                    # Input image
+        ]
+        video_codec = _still_image_video_args()
+    extra_inputs, extra_outputs = mux_args(2, subtitles_path, chapters_path)
+
     command = [
-        'ffmpeg',
-        '-loop', '1',          # Loop the image
-        '-i', str(image_p),    # Input image
+        'ffmpeg', '-y',        # Overwrite: stdin is closed, so ffmpeg cannot ask
+        *video_input,
         '-i', str(audio_p),    # Input audio
-        '-c:v', 'libx264',     # Video codec
-        '-c:a', 'aac',         # Audio codec
-        '-b:a', '192k',        # Audio bitrate
+        *extra_inputs,         # Subtitles and chapters (optional)
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        *extra_outputs,
+        *video_codec,          # Video codec
+        *_audio_codec_args(audio_info),  # Audio codec: copy when possible
         '-shortest',           # Finish encoding when the shortest input stream ends (the audio)
+        *(['-t', f"{duration:.3f}"] if duration else []),
         str(output_p)
     ]
     
+    if audio_info.mp4_compatible:
+        print(f"Copying {audio_info.codec} audio stream without re-encoding.")
+    else:
+        print(f"Transcoding {audio_info.codec} audio to AAC.")
     print(f"Creating video... Output will be saved to {output_p}")
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
+        if segment_dir:
+            print(f"Encoding {loop_segment_seconds}s still-image segment...")
+            with metrics.stage("loop_segment", renditions=1):
+                _encode_loop_segment(image_p, segment_p, loop_segment_seconds)
+        with metrics.stage("ffmpeg_encode", audio=audio_info.codec, copy_audio=audio_info.mp4_compatible):
+            run_streaming(command, "ffmpeg", "Encoding video", duration, on_progress)
         print("Video created successfully.")
     except subprocess.CalledProcessError as e:
         print(f"Error creating video: {e.stderr}")
         raise
+    finally:
+        if segment_dir:
+            shutil.rmtree(segment_dir, ignore_errors=True)
 
 if __name__ == '__main__':
-    # Example usage:
-    # Assumes you have a 'placeholder.png' and a 'dummy_audio.wav' in the 'data' directory.
-    
-    # Create dummy files if they don't exist
-    import os
-    data_dir = Path("data")
-    data_dir.mkdir(exist_ok=True)
-    
-    placeholder_image = data_dir / "placeholder.png"
-    dummy_audio = data_dir / "dummy_audio.wav"
-    output_video = data_dir / "output.mp4"
-
-    if not placeholder_image.exists():
-        print("Creating placeholder image...")
-        os.system(f"convert -size 1280x720 canvas:black {placeholder_image}") # Requires ImageMagick
-        
-    if not dummy_audio.exists():
-        print("Creating dummy audio...")
-        os.system(f"ffmpeg -f lavfi -i anullsrc=r=44100:cl=mono -t 10 -q:a 9 -acodec pcm_s16le {dummy_audio}")
+    # Example usage: encodes a short test video from generated inputs, or
+    # from your own files when given.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create a still-image video")
+    parser.add_argument("image", nargs="?", help="Input image (default: generated test card)")
+    parser.add_argument("audio", nargs="?", help="Input audio (default: 10 s generated tone)")
+    parser.add_argument("-o", "--output", default="data/output.mp4", help="Output video (default: data/output.mp4)")
+    parser.add_argument("--loop-segment", type=float, metavar="SECONDS", help="Loop a pre-encoded segment")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="video_demo_"))
+    image_path = args.image or str(work_dir / "test_card.png")
+    audio_path = args.audio or str(work_dir / "tone.m4a")
+    if not args.image:
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                        "-i", "testsrc2=size=1280x720", "-frames:v", "1", image_path], check=True)
+    if not args.audio:
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                        "-i", "sine=frequency=440", "-t", "10", "-c:a", "aac", audio_path], check=True)
 
     print("\n--- Testing Video Creation ---")
     try:
-        create_video(str(placeholder_image), str(dummy_audio), str(output_video))
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        create_video(image_path, audio_path, args.output, loop_segment_seconds=args.loop_segment)
     except Exception as e:
         print(f"An error occurred during video creation test: {e}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
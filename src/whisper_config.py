@@ -0,0 +1,153 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# whisper.cpp checkout with build/bin/whisper-cli and models/ggml-*.bin
+WHISPER_DIR = Path(os.getenv("WHISPER_DIR", Path.home() / "LLM-apps" / "whisper.cpp")).expanduser()
+
+# Default target real-time factor (processing time / audio duration). 0.25
+# means an hour of audio should take no more than 15 minutes.
+DEFAULT_TARGET_RTF = 0.25
+
+# Models from fastest to most accurate, with rough CPU costs: core-seconds of
+# compute per second of audio, and seconds to load the model.
+MODEL_LADDER = (
+    ("tiny.en", 0.08, 0.2),
+    ("base.en", 0.16, 0.4),
+    ("small.en", 0.5, 1.0),
+    ("medium.en", 1.6, 2.5),
+    ("large-v3", 3.2, 5.0),
+)
+FALLBACK_MODEL = "tiny.en"
+
+# whisper.cpp stops scaling at around 8 threads per processor; past that,
+# cores are better spent on more processors (-p), which split the audio.
+MAX_USEFUL_THREADS = 8
+# Each processor's slice of audio should be at least this long; shorter
+# slices cost accuracy at the boundaries for little speed-up.
+MIN_SECONDS_PER_PROCESSOR = 300
+
+@dataclass(frozen=True)
+class WhisperConfig:
+    """Resolved whisper-cli settings for one transcription job."""
+    executable: Path
+    model_path: Path
+    threads: int
+    processors: int = 1
+
+    @property
+    def model_name(self) -> str:
+        return self.model_path.stem.replace("ggml-", "", 1)
+
+    def cli_args(self) -> list:
+        """whisper-cli flags for threads and processors."""
+        return ["--threads", str(self.threads), "--processors", str(self.processors)]
+
+    def describe(self) -> str:
+        return f"{self.model_name}, {self.processors} x {self.threads} threads"
+
+def _env_int(name: str) -> int:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def model_path_for(name: str, whisper_dir: Path = None) -> Path:
+    """Resolves a model name ("base.en") or path to a GGML model file."""
+    if name.endswith(".bin") or os.sep in name:
+        return Path(name).expanduser()
+    return Path(whisper_dir or WHISPER_DIR) / "models" / f"ggml-{name}.bin"
+
+def installed_models(whisper_dir: Path = None) -> list:
+    """Names from MODEL_LADDER whose model files exist, fastest first."""
+    return [name for name, _, _ in MODEL_LADDER if model_path_for(name, whisper_dir).exists()]
+
+def estimate_rtf(model: str, duration: float, threads: int, processors: int = 1) -> float:
+    """Rough real-time factor of model on threads x processors cores for duration seconds of audio."""
+    costs = {name: (cost, load) for name, cost, load in MODEL_LADDER}
+    cost, load = costs.get(model, costs[FALLBACK_MODEL])
+    effective_cores = min(threads, MAX_USEFUL_THREADS) * processors
+    return (load + cost * duration / effective_cores) / duration
+
+def split_cores(cores: int, duration: float = None) -> tuple:
+    """Splits a core budget into (threads, processors) for one whisper-cli run."""
+    processors = 1
+    if duration and cores > MAX_USEFUL_THREADS:
+        processors = min(cores // MAX_USEFUL_THREADS, int(duration // MIN_SECONDS_PER_PROCESSOR))
+        processors = max(1, processors)
+    return max(1, min(cores // processors, MAX_USEFUL_THREADS)), processors
+
+def select_whisper_config(duration: float = None, concurrent_jobs: int = 1,
+                          model: str = None, threads: int = None, processors: int = None,
+                          target_rtf: float = None, cores: int = None) -> WhisperConfig:
+    """
+    Picks the whisper model, thread and processor counts for one job.
+
+    The machine's cores are shared evenly between concurrent_jobs. That core
+    budget is split into threads and processors (long audio only), and the
+    most accurate installed model whose estimated real-time factor meets
+    target_rtf is chosen; the fastest installed model is the fallback.
+
+    Each setting can be fixed by argument or by environment variable
+    (WHISPER_MODEL, WHISPER_THREADS, WHISPER_PROCESSORS, WHISPER_TARGET_RTF,
+    WHISPER_DIR); arguments win over the environment.
+
+    Args:
+        duration (float): Audio duration in seconds, if known.
+        concurrent_jobs (int): Whisper jobs expected to run at the same time.
+        model (str): Model name ("base.en") or path to a GGML file (optional).
+        threads (int): Threads per processor (optional).
+        processors (int): whisper-cli processors, each taking a slice of the audio (optional).
+        target_rtf (float): Target processing time / audio duration (optional).
+        cores (int): Cores available on the machine. Defaults to os.cpu_count().
+
+    Returns:
+        WhisperConfig: The resolved executable, model and parallelism.
+    """
+    model = model or os.getenv("WHISPER_MODEL")
+    threads = threads or _env_int("WHISPER_THREADS")
+    processors = processors or _env_int("WHISPER_PROCESSORS")
+    target_rtf = target_rtf or float(os.getenv("WHISPER_TARGET_RTF", DEFAULT_TARGET_RTF))
+    cores = cores or os.cpu_count() or 1
+
+    budget = max(1, cores // max(1, concurrent_jobs))
+    auto_threads, auto_processors = split_cores(budget, duration)
+    if processors and not threads:
+        auto_threads = max(1, budget // processors)
+    threads = threads or auto_threads
+    processors = processors or auto_processors
+
+    if not model:
+        candidates = installed_models() or [FALLBACK_MODEL]
+        model = candidates[0]
+        if duration:
+            for name in candidates:
+                if estimate_rtf(name, duration, threads, processors) <= target_rtf:
+                    model = name
+
+    return WhisperConfig(
+        executable=WHISPER_DIR / "build" / "bin" / "whisper-cli",
+        model_path=model_path_for(model),
+        threads=threads,
+        processors=processors,
+    )
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the whisper settings picked for a job")
+    parser.add_argument("duration", type=float, help="Audio duration in seconds")
+    parser.add_argument("--jobs", type=int, default=1, help="Concurrent whisper jobs (default: 1)")
+    parser.add_argument("--cores", type=int, help="Cores available (default: all)")
+    parser.add_argument("--target-rtf", type=float, help=f"Target real-time factor (default: {DEFAULT_TARGET_RTF})")
+    args = parser.parse_args()
+
+    config = select_whisper_config(args.duration, args.jobs, target_rtf=args.target_rtf, cores=args.cores)
+    print(f"Installed models: {', '.join(installed_models()) or 'none'}")
+    print(f"Model:      {config.model_path}")
+    print(f"Threads:    {config.threads}")
+    print(f"Processors: {config.processors}")
+    print(f"Estimated real-time factor: "
+          f"{estimate_rtf(config.model_name, args.duration, config.threads, config.processors):.3f}")
@@ -0,0 +1,288 @@
+import os
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+
+try:
+    import metrics
+    from subtitles import parse_srt
+except ImportError:
+    from src import metrics
+    from src.subtitles import parse_srt
+
+# Default location of the resident server started by `python3 src/whisper_server.py serve`.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8178
+STARTUP_TIMEOUT_SECONDS = 60
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class WhisperServerUnavailable(Exception):
+    """Raised when the whisper server at the configured URL cannot be reached or fails a request."""
+
+class _MultipartUpload:
+    """
+    File-like multipart/form-data body that streams the WAV from disk.
+
+    requests reads it in chunks and sends a Content-Length, so the whole
+    upload never has to sit in memory.
+    """
+
+    def __init__(self, file_path: Path, fields: dict):
+        self.boundary = uuid.uuid4().hex
+        preamble = b""
+        for name, value in fields.items():
+            preamble += (f"--{self.boundary}\r\n"
+                         f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                         f"{value}\r\n").encode("utf-8")
+        preamble += (f"--{self.boundary}\r\n"
+                     f"Content-Disposition: form-data; name=\"file\"; filename=\"{file_path.name}\"\r\n"
+                     f"Content-Type: audio/wav\r\n\r\n").encode("utf-8")
+        self._parts = [preamble, None, f"\r\n--{self.boundary}--\r\n".encode("utf-8")]
+        self._file = open(file_path, 'rb')
+        self._length = len(preamble) + file_path.stat().st_size + len(self._parts[2])
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        size = UPLOAD_CHUNK_SIZE if size is None or size < 0 else size
+        while self._parts:
+            part = self._parts[0]
+            if part is None:
+                data = self._file.read(size)
+                if data:
+                    return data
+                self._file.close()
+                self._parts.pop(0)
+                continue
+            self._parts[0] = part[size:]
+            if not self._parts[0]:
+                self._parts.pop(0)
+            if part[:size]:
+                return part[:size]
+        return b""
+
+    def close(self):
+        self._file.close()
+
+# Jobs this process is running on each server URL
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def server_urls() -> list:
+    """URLs of the whisper servers to use, from the comma-separated $WHISPER_SERVER_URL."""
+    return [url.strip() for url in os.getenv("WHISPER_SERVER_URL", "").split(",") if url.strip()]
+
+@contextmanager
+def reserve_server(urls: list):
+    """
+    Picks the server in urls with the fewest jobs running from this process
+    (each whisper-server instance runs one inference at a time) and counts
+    this job against it until the block exits.
+    """
+    with _jobs_lock:
+        url = min(urls, key=lambda u: _jobs.get(u, 0))
+        _jobs[url] = _jobs.get(url, 0) + 1
+    try:
+        yield url
+    finally:
+        with _jobs_lock:
+            _jobs[url] -= 1
+
+def is_available(url: str, timeout: float = 1.0) -> bool:
+    """Whether a whisper server answers at url."""
+    try:
+        requests.get(url.rstrip("/") + "/", timeout=timeout)
+        return True
+    except requests.RequestException:
+        return False
+
+def transcribe_with_server(wav_path: str, output_file_path: str, url: str,
+                           timeout: float = 3600, subtitles_path: str = None) -> str:
+    """
+    Sends a 16 kHz mono WAV to a running whisper.cpp server and writes the
+    plain-text transcript to output_file_path. With subtitles_path, the
+    server is asked for SRT instead; it is saved there and the transcript
+    text is taken from its segments.
+
+    Raises:
+        WhisperServerUnavailable: If the server cannot be reached, does not answer
+            in time or answers with an error status.
+    """
+    response_format = "srt" if subtitles_path else "text"
+    upload = _MultipartUpload(Path(wav_path), {"response_format": response_format, "temperature": "0.0"})
+    start = time.monotonic()
+    try:
+        response = requests.post(
+            url.rstrip("/") + "/inference",
+            data=upload,
+            headers={"Content-Type": upload.content_type},
+            timeout=(2, timeout)
+        )
+    except requests.RequestException as e:
+        raise WhisperServerUnavailable(f"Whisper server at {url} failed: {e}") from e
+    finally:
+        upload.close()
+    metrics.record_http(url, response.status_code, time.monotonic() - start,
+                        len(upload), len(response.content))
+
+    if response.status_code != 200:
+        raise WhisperServerUnavailable(f"Whisper server at {url} answered {response.status_code}: "
+                                       f"{response.text[:500]}")
+
+    text = response.text.strip()
+    if subtitles_path:
+        with open(subtitles_path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        text = "\n".join(segment["text"] for segment in parse_srt(subtitles_path) if segment["text"])
+    with open(output_file_path, 'w') as f:
+        f.write(text + "\n")
+    return str(output_file_path)
+
+class WhisperServer:
+    """
+    Manages a resident whisper.cpp server process that keeps the model loaded.
+
+    whisper-server runs one inference at a time per process, so `instances`
+    servers are started on consecutive ports to accept jobs concurrently.
+    """
+
+    def __init__(self, server_executable: Path, model_path: Path, host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT, threads: int = None, instances: int = 1):
+        self.server_executable = Path(server_executable)
+        self.model_path = Path(model_path)
+        self.host = host
+        self.port = port
+        self.threads = threads
+        self.instances = instances
+        self.processes = []
+
+    @property
+    def urls(self) -> list:
+        return [f"http://{self.host}:{self.port + i}" for i in range(self.instances)]
+
+    def start(self) -> "WhisperServer":
+        if not self.server_executable.exists():
+            raise FileNotFoundError(f"Whisper server executable not found at {self.server_executable}")
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"Whisper model not found at {self.model_path}")
+
+        for i in range(self.instances):
+            command = [
+                str(self.server_executable),
+                "--model", str(self.model_path),
+                "--host", self.host,
+                "--port", str(self.port + i),
+            ]
+            if self.threads:
+                command += ["--threads", str(self.threads)]
+            self.processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                                   stderr=subprocess.DEVNULL))
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        for url, process in zip(self.urls, self.processes):
+            while not is_available(url):
+                if process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError(f"Whisper server on {url} exited with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise TimeoutError(f"Whisper server on {url} did not start in time")
+                time.sleep(0.2)
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def _make_test_wav(path: Path, seconds: int):
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=220:duration={seconds}",
+         "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", str(path)],
+        check=True
+    )
+
+if __name__ == '__main__':
+    import argparse
+    import shutil
+    import sys
+    import tempfile
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from whisper_config import WHISPER_DIR, select_whisper_config
+
+    parser = argparse.ArgumentParser(description="Resident whisper.cpp server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Start a server and keep the model loaded")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--instances", type=int, default=1, help="Server processes on consecutive ports")
+    serve.add_argument("--threads", type=int, help="Threads per server process")
+    sub.add_parser("compare", help="Compare CLI and server latency on 1 and 50 minute inputs")
+    args = parser.parse_args()
+
+    config = select_whisper_config()
+    whisper_executable, model_path = config.executable, config.model_path
+    server_executable = WHISPER_DIR / "build" / "bin" / "whisper-server"
+
+    if args.command == "serve":
+        server = WhisperServer(server_executable, model_path, port=args.port,
+                               threads=args.threads, instances=args.instances).start()
+        print(f"Whisper server ready at {', '.join(server.urls)}")
+        print(f"Use it with: WHISPER_SERVER_URL={','.join(server.urls)}")
+        try:
+            while all(p.poll() is None for p in server.processes):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+    else:
+        work_dir = Path(tempfile.mkdtemp(prefix="whisper_compare_"))
+        port = DEFAULT_PORT + 10
+        start = time.perf_counter()
+        server = WhisperServer(server_executable, model_path, port=port).start()
+        startup = time.perf_counter() - start
+        print(f"Server startup (model load): {startup:.2f}s")
+        try:
+            print(f"{'Input':>8} {'CLI':>9} {'Server':>9}")
+            for minutes in (1, 50):
+                wav_path = work_dir / f"test_{minutes}min.wav"
+                _make_test_wav(wav_path, minutes * 60)
+
+                start = time.perf_counter()
+                subprocess.run([str(whisper_executable), "--model", str(model_path),
+                                "--file", str(wav_path), "--output-txt",
+                                "--output-file", str(wav_path.with_suffix(""))],
+                               check=True, capture_output=True)
+                cli_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                transcribe_with_server(str(wav_path), str(wav_path.with_suffix(".server.txt")),
+                                       server.urls[0])
+                server_seconds = time.perf_counter() - start
+                print(f"{minutes:>6}m {cli_seconds:8.2f}s {server_seconds:8.2f}s")
+        finally:
+            server.stop()
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+NotebookLM to YouTube Watch-Folder Daemon
+
+Watches an ingest directory and turns every new audio file into a video.
+Jobs live in a SQLite queue and each finished stage (transcript, cover art,
+video) is checkpointed, so after a crash or restart a job resumes from its
+last completed stage instead of transcribing and buying cover art again.
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent / "src"))
+
+import metrics
+from jobs import JobQueue
+from create_video import create_video_with_options
+
+AUDIO_EXTENSIONS = {".m4a", ".mp3", ".wav", ".mp4", ".aac", ".ogg", ".opus", ".flac"}
+
+# Names of the videos the daemon writes: "<stem>_video.mp4", plus
+# "<stem>_video_<rendition>.mp4" when several renditions are made
+OUTPUT_NAME_PATTERN = re.compile(r"_video(_\w+)?$")
+
+class IngestWatcher:
+    """
+    Polls a directory and enqueues audio files once they stop changing, so
+    files that are still being copied in are not picked up half-written.
+    """
+
+    def __init__(self, ingest_dir: Path, output_dir: Path, queue: JobQueue):
+        self.ingest_dir = ingest_dir
+        self.output_dir = output_dir
+        self.queue = queue
+        self._last_seen = {}
+
+    def scan(self) -> int:
+        """Enqueues settled new files and returns how many were added."""
+        added = 0
+        seen = {}
+        for path in sorted(self.ingest_dir.iterdir()):
+            if path.suffix.lower() not in AUDIO_EXTENSIONS or self._is_output(path):
+                continue
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except FileNotFoundError:
+                # Moved or deleted since the directory was listed
+                continue
+            seen[path] = (stat.st_size, stat.st_mtime)
+            if self._last_seen.get(path) != seen[path]:
+                continue
+            output_path = self.output_dir / f"{path.stem}_video.mp4"
+            if self.queue.enqueue(path.resolve(), output_path.resolve()):
+                print(f"📥 Queued: {path.name}")
+                added += 1
+        self._last_seen = seen
+        return added
+
+    def _is_output(self, path: Path) -> bool:
+        """Whether path is a video written by the daemon, e.g. when the output directory is the ingest directory."""
+        if path.suffix.lower() != ".mp4":
+            return False
+        return (OUTPUT_NAME_PATTERN.search(path.stem) is not None
+                or path.parent.resolve() == self.output_dir.resolve())
+
+def process_job(queue: JobQueue, job: dict, options: dict) -> bool:
+    """Runs one job through create_video_with_options, resuming from its checkpoints."""
+    job_id = job["id"]
+    audio_path = Path(job["audio_path"])
+    output_path = Path(job["output_path"])
+    artifacts = queue.artifacts(job_id)
+
+    if "video" in artifacts:
+        print(f"⏭️ [{audio_path.name}] Video already created: {artifacts['video']}")
+        return True
+    if output_path.exists():
+        # Left over from an interrupted encode
+        output_path.unlink()
+
+    if "cover_art" in artifacts:
+        print(f"🔁 [{audio_path.name}] Resuming from cover art: {artifacts['cover_art']}")
+    elif "transcript" in artifacts:
+        print(f"🔁 [{audio_path.name}] Resuming from transcript: {artifacts['transcript']}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    return create_video_with_options(
+        audio_path=str(audio_path),
+        output_path=str(output_path),
+        output_dir=str(output_path.parent),
+        cover_art_path=artifacts.get("cover_art") or options.get("cover_art_path"),
+        custom_prompt=options.get("custom_prompt"),
+        auto_approve=True,
+        loop_segment_seconds=options.get("loop_segment_seconds"),
+        whisper_model=options.get("whisper_model"),
+        transcript_path=artifacts.get("transcript"),
+        on_checkpoint=lambda stage, path: queue.checkpoint(job_id, stage, Path(path).resolve())
+    )
+
+def worker(queue: JobQueue, options: dict, stop: threading.Event, poll_seconds: float):
+    while not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            stop.wait(poll_seconds)
+            continue
+
+        name = Path(job["audio_path"]).name
+        print(f"\n🚀 [{name}] Starting (attempt {job['attempts']})")
+        try:
+            ok = process_job(queue, job, options)
+            error = None if ok else "Video creation failed"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        if ok:
+            queue.complete(job["id"])
+            print(f"✅ [{name}] Done")
+        else:
+            queue.fail(job["id"], error)
+            print(f"❌ [{name}] {error}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="🎙️ Watch a folder and turn new audio files into videos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+🎯 Examples:
+
+Watch a folder with two workers:
+  python3 watch_daemon.py ~/Downloads/notebooklm --workers 2
+
+Check the queue:
+  python3 src/jobs.py data/jobs.sqlite
+        """
+    )
+    parser.add_argument("ingest_dir", help="Directory to watch for new audio files")
+    parser.add_argument("--output-dir", default="data",
+                       help="Directory for output videos (default: data)")
+    parser.add_argument("--db", default="data/jobs.sqlite",
+                       help="Job queue database (default: data/jobs.sqlite)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Jobs processed at the same time (default: 1)")
+    parser.add_argument("--poll", type=float, default=5.0, metavar="SECONDS",
+                       help="How often to scan the ingest directory (default: 5)")
+    parser.add_argument("--prompt", help="Custom prompt for AI cover art generation (skips transcription)")
+    parser.add_argument("--cover-art", help="Use this cover art image for every episode")
+    parser.add_argument("--loop-segment", type=float, metavar="SECONDS",
+                       help="Encode a still-image segment of SECONDS once and repeat it with stream copy")
+    parser.add_argument("--whisper-model", metavar="NAME",
+                       help="Whisper model name (e.g. base.en) or path (default: picked per episode)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                       help="Serve Prometheus metrics at http://localhost:PORT/metrics")
+    args = parser.parse_args()
+
+    ingest_dir = Path(args.ingest_dir)
+    if not ingest_dir.is_dir():
+        print(f"❌ Not a directory: {ingest_dir}")
+        sys.exit(1)
+
+    if args.metrics_port:
+        metrics.start_prometheus_server(args.metrics_port)
+        print(f"📈 Metrics at http://localhost:{args.metrics_port}/metrics")
+
+    queue = JobQueue(args.db)
+    recovered = queue.recover()
+    if recovered:
+        print(f"🔁 Requeued {recovered} interrupted jobs")
+
+    options = {
+        "custom_prompt": args.prompt,
+        "cover_art_path": args.cover_art,
+        "loop_segment_seconds": args.loop_segment,
+        "whisper_model": args.whisper_model,
+    }
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=worker, args=(queue, options, stop, args.poll),
+                         name=f"worker-{i}", daemon=True)
+        for i in range(args.workers)
+    ]
+    for thread in workers:
+        thread.start()
+
+    watcher = IngestWatcher(ingest_dir, Path(args.output_dir), queue)
+    print(f"👀 Watching {ingest_dir} with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        while True:
+            watcher.scan()
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping after the current jobs finish (Ctrl+C again to quit now;"
+              " interrupted jobs resume on the next start)")
+        stop.set()
+        try:
+            for thread in workers:
+                thread.join()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()